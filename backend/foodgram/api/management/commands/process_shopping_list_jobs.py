@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.utils.shopping_list_jobs import (claim_job, delete_expired_jobs,
+                                          process_job)
+
+
+class Command(BaseCommand):
+    help = 'Render queued shopping lists outside of the request cycle.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process pending jobs and exit.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when queue is empty.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_job()
+            if job is not None:
+                try:
+                    process_job(job)
+                except Exception as error:
+                    self.stderr.write(f'Job {job.id} failed: {error}')
+                continue
+
+            delete_expired_jobs()
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,315 @@
+import json
+import random
+import subprocess
+import time
+import tracemalloc
+from itertools import cycle
+from statistics import quantiles
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.management.commands.generate_benchmark_data import \
+    USERNAME_PREFIX
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+LIMIT = 10
+MEMORY_ITERATIONS = 5
+SUCCESS_STATUSES = (200, 201, 204)
+
+
+def percentiles(values):
+    """p50, p95 and p99 of the given values."""
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'p99': values[0]}
+    points = quantiles(values, n=100, method='inclusive')
+    return {'p50': points[49], 'p95': points[94], 'p99': points[98]}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Measure latency, queries and memory of the main endpoints '
+            'over data made by generate_benchmark_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Run only given scenarios, can be repeated.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write results to JSON file.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON file of a previous run to compare p95 with.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).order_by('-followers_count', 'id').first()
+        if user is None:
+            raise CommandError('Run generate_benchmark_data first.')
+        subscriber = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).annotate(
+            subscriptions=Count('subscribes')
+        ).order_by('-subscriptions', 'id').first()
+
+        rand = random.Random(options['seed'])
+        scenarios = self.get_scenarios(rand, user, subscriber)
+        selected = options['scenario'] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(
+                f'Unknown scenarios: {", ".join(sorted(unknown))}. '
+                f'Available: {", ".join(scenarios)}.'
+            )
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name in selected:
+                client, make_url = scenarios[name]
+                results[name] = self.measure(client, make_url, options)
+                if name in self.restores:
+                    self.restores[name]()
+                self.report(name, results[name])
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {
+                        'revision': git_revision(),
+                        'vendor': connection.vendor,
+                        'created_at': timezone.now().isoformat(),
+                        'iterations': options['iterations'],
+                        'dataset': {
+                            'users': User.objects.count(),
+                            'recipes': Recipe.objects.count(),
+                            'ingredients': Ingredient.objects.count(),
+                        },
+                        'scenarios': results,
+                    },
+                    file,
+                    indent=2
+                )
+
+    def get_scenarios(self, rand, user, subscriber):
+        anonymous = APIClient()
+        client = APIClient()
+        client.force_authenticate(user)
+        subscriber_client = APIClient()
+        subscriber_client.force_authenticate(subscriber)
+
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        author_ids = list(
+            User.objects.filter(recipes_count__gt=0).values_list(
+                'id', flat=True
+            )
+        )
+        tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        names = list(
+            Ingredient.objects.order_by('id').values_list('name', flat=True)
+        )
+        prefixes = [
+            name[:rand.randint(1, 3)]
+            for name in rand.sample(names, min(100, len(names)))
+        ]
+        if not recipe_ids or not prefixes:
+            raise CommandError('Run generate_benchmark_data first.')
+        action_relations = {
+            'favorite': 'favorited_recipes',
+            'shopping_cart': 'shopping_cart',
+        }
+        # Toggles leave relation changed after an odd number of calls.
+        self.restores = {}
+
+        def page():
+            return rand.randint(1, max(len(recipe_ids) // LIMIT // 10, 1))
+
+        def toggle(action):
+            """
+            Adds a recipe to user relation and removes it back
+            on every other call, so relation size stays the same.
+            Relation is restored after the scenario whatever
+            the number of calls was.
+            """
+            relation = getattr(user, action_relations[action])
+            related = set(relation.values_list('id', flat=True))
+            recipe_id = next(
+                (pk for pk in recipe_ids if pk not in related),
+                recipe_ids[0]
+            )
+
+            def restore():
+                if recipe_id in related:
+                    relation.add(recipe_id)
+                else:
+                    relation.remove(recipe_id)
+
+            self.restores[f'{action}_toggle'] = restore
+            methods = cycle(('post', 'delete'))
+            return lambda: (
+                next(methods),
+                f'/api/recipes/{recipe_id}/{action}/'
+            )
+
+        def tags():
+            return '&'.join(
+                f'tags={slug}'
+                for slug in rand.sample(tag_slugs, min(2, len(tag_slugs)))
+            )
+
+        return {
+            'recipes_list': (
+                anonymous,
+                lambda: f'/api/recipes/?limit={LIMIT}&page={page()}'
+            ),
+            'recipes_list_auth': (
+                client,
+                lambda: f'/api/recipes/?limit={LIMIT}&page={page()}'
+            ),
+            'recipes_list_tags': (
+                client,
+                lambda: f'/api/recipes/?limit={LIMIT}&{tags()}'
+            ),
+            'recipes_list_author': (
+                client,
+                lambda: (f'/api/recipes/?limit={LIMIT}'
+                         f'&author={rand.choice(author_ids)}')
+            ),
+            'recipes_list_favorited': (
+                client,
+                lambda: f'/api/recipes/?limit={LIMIT}&is_favorited=1'
+            ),
+            'recipes_list_cursor': (
+                client,
+                lambda: f'/api/recipes/?limit={LIMIT}&pagination=cursor'
+            ),
+            'recipe_detail': (
+                client,
+                lambda: f'/api/recipes/{rand.choice(recipe_ids)}/'
+            ),
+            'subscriptions': (
+                subscriber_client,
+                lambda: '/api/users/subscriptions/?recipes_limit=3'
+            ),
+            'feed': (
+                subscriber_client,
+                lambda: f'/api/recipes/feed/?limit={LIMIT}'
+            ),
+            'shopping_cart_pdf': (
+                client,
+                lambda: '/api/recipes/download_shopping_cart/?format=pdf'
+            ),
+            'shopping_cart_csv': (
+                client,
+                lambda: '/api/recipes/download_shopping_cart/?format=csv'
+            ),
+            'favorite_toggle': (client, toggle('favorite')),
+            'shopping_cart_toggle': (client, toggle('shopping_cart')),
+            'ingredient_autocomplete': (
+                anonymous,
+                lambda: f'/api/ingredients/?name={rand.choice(prefixes)}'
+            ),
+        }
+
+    def request(self, client, target):
+        """Make request to url or to (method, url) of a scenario."""
+        method, url = (
+            target if isinstance(target, tuple) else ('get', target)
+        )
+        response = getattr(client, method)(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code not in SUCCESS_STATUSES:
+            raise CommandError(
+                f'{method.upper()} {url} returned {response.status_code}.'
+            )
+
+    def measure(self, client, make_url, options):
+        for _ in range(options['warmup']):
+            self.request(client, make_url())
+
+        latencies = []
+        queries = []
+        for _ in range(options['iterations']):
+            url = make_url()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                self.request(client, url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+
+        # Tracing slows requests down, so memory is measured separately.
+        tracemalloc.start()
+        try:
+            for _ in range(min(options['iterations'], MEMORY_ITERATIONS)):
+                self.request(client, make_url())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'latency_ms': {
+                key: round(value, 3)
+                for key, value in percentiles(latencies).items()
+            },
+            'queries': {
+                'min': min(queries),
+                'max': max(queries),
+                'mean': round(sum(queries) / len(queries), 2),
+            },
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{name:<26}'
+            f'p50 {latency["p50"]:>9.2f} ms  '
+            f'p95 {latency["p95"]:>9.2f} ms  '
+            f'p99 {latency["p99"]:>9.2f} ms  '
+            f'queries {result["queries"]["max"]:>4}  '
+            f'peak {result["peak_memory_kb"]:>9.1f} KiB'
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)['scenarios']
+        self.stdout.write(f'\nCompared to {path}:')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]['latency_ms']['p95']
+            after = result['latency_ms']['p95']
+            change = (after - before) / before * 100 if before else 0
+            queries = (result['queries']['max']
+                       - previous[name]['queries']['max'])
+            self.stdout.write(
+                f'{name:<26}p95 {change:+7.1f}%  queries {queries:+d}'
+            )
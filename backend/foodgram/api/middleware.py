@@ -0,0 +1,67 @@
+import time
+
+from django.db import connection
+
+from api.utils.metrics import registry
+
+UNRESOLVED_ROUTE = 'unresolved'
+
+
+class QueryCounter:
+    """connection.execute_wrapper, what counts queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def get_route(request):
+    """Viewset action, such as RecipeViewSet.list, or url name."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    view = match.func
+    view_class = getattr(view, 'cls', None)
+    if view_class is None:
+        return match.view_name or UNRESOLVED_ROUTE
+    actions = getattr(view, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    """Records latency, db queries and response size of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        response_bytes = (
+            0 if response.streaming else len(response.content)
+        )
+        registry.observe(
+            route=get_route(request),
+            method=request.method,
+            status=response.status_code,
+            seconds=elapsed,
+            queries=counter.count,
+            query_seconds=counter.seconds,
+            response_bytes=response_bytes
+        )
+        return response
@@ -1,6 +1,9 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+from recipes.tags import tag_map
 
 
 class IngredientFilter(FilterSet):
@@ -20,17 +23,26 @@ class RecipeFilter(FilterSet):
         field_name='is_in_shopping_cart',
         method='filter_is_in_shopping_cart'
     )
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        field_name='tags',
+        method='filter_tags'
     )
     author = filters.NumberFilter(field_name='author__id')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tag_ids = {}
+        if 'tags' in self.data:
+            self.tag_ids = tag_map.get_ids()
+        self.filters['tags'].extra['choices'] = [
+            (slug, slug) for slug in self.tag_ids
+        ]
+
     def filter_is_favorited(self, queryset, name, value):
         if value:
             return queryset.filter(favorited__id=self.request.user.id)
@@ -40,3 +52,20 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(in_shopping_cart__id=self.request.user.id)
         return queryset
+
+    def filter_tags(self, queryset, name, value):
+        # EXISTS instead of a join keeps recipes with several of the
+        # selected tags from repeating without DISTINCT.
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef('pk'),
+                    tag_id__in=[self.tag_ids[slug] for slug in value]
+                )
+            )
+        )
+
+    def filter_search(self, queryset, name, value):
+        if value.strip():
+            return search_recipes(queryset, value)
+        return queryset
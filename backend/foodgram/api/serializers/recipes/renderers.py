@@ -1,10 +1,21 @@
+import json
+from abc import ABCMeta, abstractmethod
+
 from rest_framework.renderers import BaseRenderer
 
-from api.utils.shopping_cart import make_pdf
+from api.utils.shopping_cart import (get_shopping_cart_pdf,
+                                     iter_shopping_list_csv,
+                                     iter_shopping_list_text)
+from foodgram.settings import ENCODING
 
 CONTENT_TYPE = 'application/pdf'
 
 
+def render_error(data, charset=ENCODING):
+    """Render error responses of shopping list renderers."""
+    return json.dumps(data, ensure_ascii=False).encode(charset)
+
+
 class PdfRenderer(BaseRenderer):
     """Custom renderer for accepting application/pdf headers"""
     media_type = CONTENT_TYPE
@@ -13,5 +24,42 @@ class PdfRenderer(BaseRenderer):
     render_style = 'binary'
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
-        pdf = make_pdf(data['user'])
+        if not (isinstance(data, dict) and 'user' in data):
+            return render_error(data)
+        pdf = get_shopping_cart_pdf(data['user'])
         return pdf
+
+
+class StreamingShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    """
+    Base renderer for shopping list formats,
+    what can be streamed row by row.
+    """
+    charset = ENCODING
+
+    @abstractmethod
+    def stream(self, user):
+        """Iterable of text chunks of user shopping list."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and 'user' in data:
+            return ''.join(self.stream(data['user'])).encode(self.charset)
+        return render_error(data, self.charset)
+
+
+class TextRenderer(StreamingShoppingListRenderer):
+    """Renderer for accepting text/plain headers"""
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, user):
+        return iter_shopping_list_text(user)
+
+
+class CsvRenderer(StreamingShoppingListRenderer):
+    """Renderer for accepting text/csv headers"""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, user):
+        return iter_shopping_list_csv(user)
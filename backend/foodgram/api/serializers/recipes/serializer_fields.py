@@ -1,16 +1,195 @@
 import base64
+import binascii
+import hashlib
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image
 from rest_framework import serializers
 
+from foodgram.settings import RECIPE_IMAGE_MAX_SIZE, RECIPE_IMAGE_SIZES
+from recipes.images import FORMATS, derivative_url
+
+DATA_URI_PREFIX = 'data:image/'
+BASE64_MARKER = ';base64,'
+# Characters of base64 data read at once.
+CHUNK_SIZE = 64 * 1024
+# Extensions of accepted image formats, as detected by Pillow.
+IMAGE_EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+    'BMP': 'bmp',
+}
+
 
 class Base64ImageField(serializers.ImageField):
-    """Custom field to convert image to Base64 byte-string"""
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+    """
+    Custom field to convert image to Base64 byte-string.
+    Images are decoded by chunks into in-memory or temporary file,
+    like regular uploads, and named by hash of their content
+    with extension of the format detected by Pillow.
+    Name and media type sent by client are never used.
+    """
+    default_error_messages = {
+        'max_size': 'Image should not be larger than {max_size} bytes.',
+    }
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith(DATA_URI_PREFIX):
+            data = self.decode(data)
+        elif hasattr(data, 'chunks'):
+            self.rename_upload(data)
 
         return super().to_internal_value(data)
+
+    def check_size(self, size):
+        if size > RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=RECIPE_IMAGE_MAX_SIZE)
+
+    def decode(self, data):
+        marker = data.find(BASE64_MARKER, len(DATA_URI_PREFIX))
+        if marker == -1:
+            self.fail('invalid')
+        start = marker + len(BASE64_MARKER)
+        size = (len(data) - start) * 3 // 4
+        self.check_size(size)
+
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            upload = TemporaryUploadedFile('image', None, size, None)
+        else:
+            upload = InMemoryUploadedFile(
+                BytesIO(), None, 'image', None, size, None
+            )
+
+        try:
+            self.decode_chunks(data, start, upload)
+            upload.size = upload.tell()
+            upload.seek(0)
+            self.rename_upload(upload)
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        return upload
+
+    def decode_chunks(self, data, start, upload):
+        """
+        Write base64 data, starting at start, decoded into upload.
+        Whitespace of line-wrapped data is skipped, the rest
+        is decoded by whole groups of 4 characters.
+        """
+        pending = ''
+        for offset in range(start, len(data), CHUNK_SIZE):
+            pending += ''.join(data[offset:offset + CHUNK_SIZE].split())
+            complete = len(pending) - len(pending) % 4
+            upload.write(self.b64decode(pending[:complete]))
+            pending = pending[complete:]
+        if pending:
+            upload.write(self.b64decode(pending))
+
+    def b64decode(self, chunk):
+        try:
+            return base64.b64decode(chunk, validate=True)
+        except binascii.Error:
+            self.fail('invalid')
+
+    def rename_upload(self, upload):
+        """Name uploaded file by hash of its content and detected format."""
+        self.check_size(upload.size)
+        try:
+            with Image.open(upload) as image:
+                image_format = image.format
+                content_type = image.get_format_mimetype()
+        except Exception:
+            self.fail('invalid_image')
+        if image_format not in IMAGE_EXTENSIONS:
+            self.fail('invalid_image')
+
+        digest = hashlib.sha256()
+        upload.seek(0)
+        for chunk in upload.chunks():
+            digest.update(chunk)
+        upload.seek(0)
+        upload.name = (
+            f'{digest.hexdigest()}.{IMAGE_EXTENSIONS[image_format]}'
+        )
+        upload.content_type = content_type
+
+
+class RecipeImageField(serializers.ReadOnlyField):
+    """
+    Url of recipe image in given size, JPEG for compatibility.
+    Size may come from serializer context as image_size.
+    Falls back to the original, until derivatives are made.
+    """
+    def __init__(self, size=None, **kwargs):
+        self.size = size
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        size = self.size or self.context.get('image_size')
+        url = derivative_url(recipe, size, 'jpeg') if size else None
+        if url is None:
+            if not recipe.image:
+                return None
+            url = recipe.image.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class RecipeImagesField(serializers.ReadOnlyField):
+    """Urls of every image derivative by size and format."""
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        images = {}
+        for size in RECIPE_IMAGE_SIZES:
+            images[size] = {}
+            for image_format in FORMATS:
+                url = derivative_url(recipe, size, image_format)
+                if url and request:
+                    url = request.build_absolute_uri(url)
+                images[size][image_format] = url
+        return images
+
+
+class PrimaryKeysRelatedField(serializers.ManyRelatedField):
+    """
+    List of primary keys, loaded with one query instead of one per key.
+    Repeated keys are kept, to be reported by validation.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for value in data:
+            if isinstance(value, bool):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(value).__name__
+                )
+            try:
+                pks.append(pk_field.to_python(value))
+            except ValidationError:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(value).__name__
+                )
+
+        objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                self.child_relation.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
@@ -1,11 +1,23 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.urls import reverse
 from rest_framework import serializers
 
-from api.serializers.recipes.serializer_fields import Base64ImageField
+from api.serializers.recipes.serializer_fields import (Base64ImageField,
+                                                       PrimaryKeysRelatedField,
+                                                       RecipeImageField,
+                                                       RecipeImagesField)
 from api.serializers.users.serializers import UserSerializer
 from foodgram.settings import (MAX_AMOUNT, MAX_COOKING_TIME, MAX_INGREDIENTS,
                                MAX_TAGS, MIN_AMOUNT, MIN_COOKING_TIME,
-                               MIN_INGREDIENTS, MIN_TAGS)
-from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+                               MIN_INGREDIENTS, MIN_TAGS,
+                               RECIPE_FRAGMENT_CACHE_TIMEOUT)
+from recipes.models import (Ingredient, IngredientAmount, Recipe,
+                            ShoppingListJob, Tag, relation_prefetches)
+from recipes.versions import batch_versions
+
+FRAGMENT_PREFIX = 'recipe-fragment:'
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -25,10 +37,11 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    """
+    Ingredient ids are validated in bulk
+    by CreateRecipeSerializer.validate_ingredients.
+    """
+    id = serializers.IntegerField(source='ingredient_id')
 
     class Meta:
         model = IngredientAmount
@@ -67,14 +80,88 @@ class IngredientsInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer to represent Recipe objects. """
-    image = Base64ImageField()
-    author = UserSerializer(read_only=True)
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    """
+    Part of recipe representation, what is the same for every user.
+    Cached by recipe version in get_recipe_fragments.
+    """
+    image = RecipeImageField()
+    images = RecipeImagesField()
     tags = TagSerializer(read_only=True, many=True)
     ingredients = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'tags',
+            'ingredients',
+            'name',
+            'image',
+            'images',
+            'text',
+            'cooking_time',
+        )
+
+    def get_ingredients(self, recipe):
+        ingredients = recipe.recipe_ingredients.all()
+        return IngredientsInRecipeSerializer(ingredients, many=True).data
+
+
+def fragment_key(recipe, context):
+    """
+    Cache key of recipe fragment.
+    Image urls depend on requested size and on request host.
+    """
+    request = context.get('request')
+    origin = request.build_absolute_uri('/') if request else ''
+    return (f'{FRAGMENT_PREFIX}{recipe.pk}:{recipe.version}:'
+            f'{context.get("image_size") or ""}:{origin}')
+
+
+def get_recipe_fragments(recipes, context):
+    """
+    Fragments of recipes by recipe id, loaded with one cache multi-get.
+    Missing fragments are built with one prefetch for all of them.
+    """
+    keys = {fragment_key(recipe, context): recipe for recipe in recipes}
+    fragments = cache.get_many(keys.keys())
+    missing = {
+        key: recipe for key, recipe in keys.items() if key not in fragments
+    }
+    if missing:
+        prefetch_related_objects(
+            list(missing.values()),
+            *relation_prefetches()
+        )
+        built = {
+            key: RecipeFragmentSerializer(recipe, context=context).data
+            for key, recipe in missing.items()
+        }
+        cache.set_many(built, timeout=RECIPE_FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(built)
+    return {recipe.pk: fragments[key] for key, recipe in keys.items()}
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Loads fragments of all listed recipes at once."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        self.child.fragments = get_recipe_fragments(recipes, self.context)
+        return super().to_representation(recipes)
+
+
+class RecipeSerializer(RecipeFragmentSerializer):
+    """
+    Serializer to represent Recipe objects.
+    Cached fragment is merged with author, counters and flags
+    of request user.
+    """
+    author = UserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    fragments = None
 
     class Meta:
         model = Recipe
@@ -87,32 +174,80 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time',
+            'favorites_count',
+            'in_cart_count',
         )
-
-    def get_ingredients(self, recipe):
-        ingredients = IngredientAmount.objects.filter(recipe=recipe)
-        return IngredientsInRecipeSerializer(ingredients, many=True).data
+        read_only_fields = ('favorites_count', 'in_cart_count')
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, recipe):
+        fragment = (self.fragments or {}).get(recipe.pk)
+        if fragment is None:
+            fragment = get_recipe_fragments((recipe, ), self.context)[
+                recipe.pk
+            ]
+        representation = {}
+        for field in self._readable_fields:
+            if field.field_name in fragment:
+                value = fragment[field.field_name]
+            else:
+                value = field.to_representation(field.get_attribute(recipe))
+            representation[field.field_name] = value
+        return representation
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return recipe in request.user.favorited_recipes.all()
+        return recipe.favorited.filter(pk=request.user.pk).exists()
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return recipe in request.user.shopping_cart.all()
+        return recipe.in_shopping_cart.filter(pk=request.user.pk).exists()
+
+
+def represent_saved_recipes(recipes, context):
+    """
+    Representations of saved recipes, refetched at once,
+    since fresh rows carry current version and flags of request user.
+    """
+    request = context.get('request')
+    fresh = Recipe.objects.select_related('author').with_user_flags(
+        request.user if request else None
+    ).in_bulk([recipe.pk for recipe in recipes])
+    return RecipeSerializer(
+        [fresh[recipe.pk] for recipe in recipes],
+        many=True,
+        context={
+            'request': request,
+            'image_size': context.get('image_size')
+        }
+    ).data
+
+
+class CreateRecipeListSerializer(serializers.ListSerializer):
+    """Represents all saved recipes with one refetch."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        return represent_saved_recipes(recipes, self.context)
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
     """Serializer for create recipe objects. """
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
+    tags = PrimaryKeysRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Tag.objects.all()
+        )
     )
     author = UserSerializer(
         read_only=True,
@@ -134,6 +269,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             'text',
             'cooking_time'
         )
+        list_serializer_class = CreateRecipeListSerializer
         validators = (
             serializers.UniqueTogetherValidator(
                 queryset=model.objects.all(),
@@ -153,7 +289,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 ]
             )
 
-        ingredient_ids = {ingredient['ingredient'].id for ingredient in value}
+        ingredient_ids = {ingredient['ingredient_id'] for ingredient in value}
         unique_ingredient_ids = len(ingredient_ids)
         total_ingredient_ids = len(value)
 
@@ -261,6 +397,77 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             ]
         )
 
+    def set_ingredients(self, recipe, ingredients_data):
+        """
+        Bring recipe ingredient amounts in line with ingredients_data,
+        touching only changed rows.
+        """
+        amounts = {
+            ingredient['ingredient_id']: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        existing = {
+            ingredient_amount.ingredient_id: ingredient_amount
+            for ingredient_amount in IngredientAmount.objects.filter(
+                recipe=recipe
+            )
+        }
+
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            IngredientAmount.objects.filter(
+                recipe=recipe,
+                ingredient_id__in=removed
+            ).delete()
+        amount_deltas = {
+            ingredient_id: -existing[ingredient_id].amount
+            for ingredient_id in removed
+        }
+
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            ingredient_amount = existing.get(ingredient_id)
+            if ingredient_amount and ingredient_amount.amount != amount:
+                amount_deltas[ingredient_id] = (
+                    amount - ingredient_amount.amount
+                )
+                ingredient_amount.amount = amount
+                changed.append(ingredient_amount)
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ('amount',))
+
+        added = [
+            IngredientAmount(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if added:
+            IngredientAmount.objects.bulk_create(added)
+            amount_deltas.update(
+                (ingredient_amount.ingredient_id, ingredient_amount.amount)
+                for ingredient_amount in added
+            )
+
+        # Bulk operations send no signals, so changes are sent at once.
+        IngredientAmount.send_changes({
+            (recipe.pk, ingredient_id): delta
+            for ingredient_id, delta in amount_deltas.items()
+        })
+
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            # Decoded image is moved or copied into storage by now.
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
@@ -268,15 +475,18 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         validated_data['author'] = request.user
 
-        recipe = Recipe.objects.create(**validated_data)
+        with batch_versions():
+            recipe = Recipe.objects.create(**validated_data)
 
-        for ingredient_data in ingredients_data:
-            IngredientAmount.objects.create(recipe=recipe, **ingredient_data)
-        for tag in tags_data:
-            recipe.tags.add(tag)
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(recipe=recipe, **ingredient_data)
+                for ingredient_data in ingredients_data
+            )
+            recipe.tags.set(tags_data)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
@@ -286,31 +496,39 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         )
         instance.image = validated_data.get('image', instance.image)
 
-        if 'tags' in validated_data:
-            instance.tags.set([])
-            for tag_data in validated_data.pop('tags'):
-                instance.tags.add(tag_data)
-
-        if 'ingredients' in validated_data:
-            IngredientAmount.objects.filter(
-                recipe=instance
-            ).delete()
+        with batch_versions():
+            if 'tags' in validated_data:
+                instance.tags.set(validated_data.pop('tags'))
 
-            ingredients_data = validated_data.pop('ingredients')
-            for ingredient in ingredients_data:
-                ingredient_instance = ingredient.get('ingredient')
-                instance.ingredients.add(
-                    ingredient_instance,
-                    through_defaults={'amount': ingredient.get('amount')}
+            if 'ingredients' in validated_data:
+                self.set_ingredients(
+                    instance,
+                    validated_data.pop('ingredients')
                 )
 
-        instance.save()
+            instance.save()
         return instance
 
     def to_representation(self, instance):
+        return represent_saved_recipes((instance, ), self.context)[0]
+
+
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    """Serializer to represent shopping list rendering jobs. """
+    file = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShoppingListJob
+        fields = ('id', 'status', 'progress', 'error', 'file')
+
+    def get_file(self, job):
+        if job.status != ShoppingListJob.DONE:
+            return None
+        url = reverse(
+            'api:Recipe-viewset-shopping-list-file',
+            kwargs={'job_id': job.id}
+        )
         request = self.context.get('request')
-        context = {'request': request}
-        return RecipeSerializer(
-            instance,
-            context=context
-        ).data
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
@@ -1,15 +1,28 @@
 from rest_framework import serializers
 
-from api.serializers.recipes.serializer_fields import Base64ImageField
+from api.serializers.recipes.serializer_fields import RecipeImageField
 from api.serializers.users.validators import (check_user_is_not_registred,
                                               check_username)
+from foodgram.settings import BATCH_MAX_SIZE
 from recipes.models import Recipe
 from users.models import User
 
 
+def get_subscribed_ids(request):
+    """
+    Ids of authors, what request user is subscribed to.
+    Loaded once per request and memoized on it.
+    """
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, 'subscribed_ids'):
+        request.subscribed_ids = request.user.get_subscribed_ids()
+    return request.subscribed_ids
+
+
 class UserRecipeSerializer(serializers.ModelSerializer):
     """This serializer is necessary to prevent recircular import. """
-    image = Base64ImageField()
+    image = RecipeImageField(size='thumb')
 
     class Meta:
         model = Recipe
@@ -29,8 +42,11 @@ class UserSerializer(serializers.ModelSerializer):
             'first_name',
             'last_name',
             'is_subscribed',
+            'recipes_count',
+            'followers_count',
             'password'
         )
+        read_only_fields = ('recipes_count', 'followers_count')
         extra_kwargs = {
             'password': {'write_only': True},
             'is_subscribed': {'read_only': True}
@@ -67,17 +83,14 @@ class UserSerializer(serializers.ModelSerializer):
         return User.objects.create(**validated_data)
 
     def get_is_subscribed(self, object):
-
-        return object.username in self.context.get(
-            'request',
-            None
-        ).user.get_subscribes()
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
+        return object.id in get_subscribed_ids(self.context.get('request'))
 
 
 class SubscriptionsSerializer(serializers.ModelSerializer):
     """Serializer for subscriptions. """
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -90,27 +103,36 @@ class SubscriptionsSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed',
             'recipes',
-            'recipes_count'
+            'recipes_count',
+            'followers_count'
         )
+        read_only_fields = ('recipes_count', 'followers_count')
 
     def get_recipes(self, object):
         limit = self.context.get('recipes_limit', None)
-        if limit and limit.isdigit():
+        if hasattr(object, 'limited_recipes'):
+            recipes = object.limited_recipes
+        elif limit:
             recipes = object.recipes.all()[:int(limit)]
         else:
             recipes = object.recipes.all()
         recipes = UserRecipeSerializer(
             recipes,
-            many=True
+            many=True,
+            context={'request': self.context.get('request')}
         )
         return recipes.data
 
-    def get_recipes_count(self, object):
-        return object.recipes.all().count()
-
     def get_is_subscribed(self, object):
-
-        return object.username in self.context.get(
-            'request',
-            None
-        ).user.get_subscribes()
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
+        return object.id in get_subscribed_ids(self.context.get('request'))
+
+
+class BatchSerializer(serializers.Serializer):
+    """Ids of recipes or authors for batch add and remove. """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_MAX_SIZE
+    )
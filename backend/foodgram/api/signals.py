@@ -0,0 +1,216 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from api.utils.response_cache import (COUNTERS_TAG, RECIPES_TAG, SEARCH_TAG,
+                                      author_tag, invalidate, recipe_tag,
+                                      tag_tag, tagged_tag)
+from api.utils.ingredient_index import ingredient_index
+from recipes.models import (Ingredient, IngredientAmount, Recipe,
+                            TableVersion, Tag, ingredient_amounts_changed)
+from users.models import User
+
+VERSIONED_MODELS = (Ingredient, Recipe, Tag, User)
+VERSIONED_RELATIONS = (
+    Recipe.favorited.through,
+    Recipe.in_shopping_cart.through,
+    Recipe.tags.through,
+    User.subscribes.through,
+)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    # Rebuilt after commit, so it does not pick up rows being replaced.
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+def bump_table_version(sender, raw=False, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no response shows.
+    if raw or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    TableVersion.bump(sender._meta.label)
+
+
+def bump_recipe_version(sender, raw=False, **kwargs):
+    if raw:
+        return
+    TableVersion.bump(Recipe._meta.label)
+
+
+def bump_relation_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        TableVersion.bump(sender._meta.label)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_table_version, sender=model)
+    post_delete.connect(bump_table_version, sender=model)
+
+for relation in VERSIONED_RELATIONS:
+    m2m_changed.connect(bump_relation_version, sender=relation)
+
+# Sent once per recipe, instead of per-row signals, which would
+# turn off fast delete of ingredient amounts.
+ingredient_amounts_changed.connect(
+    bump_recipe_version,
+    sender=IngredientAmount
+)
+
+
+def changed_pks(instance, action, pk_set, accessor):
+    """
+    Primary keys on the other side of changed m2m relation,
+    remembered on pre_clear, since post_clear has no pk_set.
+    """
+    if action == 'pre_clear':
+        instance._response_cache_cleared = set(
+            getattr(instance, accessor).values_list('pk', flat=True)
+        )
+    elif action in ('post_add', 'post_remove'):
+        return pk_set
+    elif action == 'post_clear':
+        return instance.__dict__.pop('_response_cache_cleared', set())
+    return None
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_saved_recipe(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    tags = [recipe_tag(instance.pk), SEARCH_TAG]
+    if created:
+        tags += [RECIPES_TAG, author_tag(instance.author_id)]
+    invalidate(*tags)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_tags(sender, instance, **kwargs):
+    # Tag relations are removed by cascade before post_delete.
+    instance._response_cache_slugs = list(
+        instance.tags.values_list('slug', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_deleted_recipe(sender, instance, **kwargs):
+    invalidate(
+        recipe_tag(instance.pk),
+        author_tag(instance.author_id),
+        RECIPES_TAG,
+        SEARCH_TAG,
+        *(tagged_tag(slug) for slug in getattr(
+            instance, '_response_cache_slugs', ()
+        ))
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    accessor = 'tagged_recipes' if reverse else 'tags'
+    pks = changed_pks(instance, action, pk_set, accessor)
+    if not pks:
+        return
+    if reverse:
+        invalidate(
+            tagged_tag(instance.slug),
+            *(recipe_tag(pk) for pk in pks)
+        )
+    else:
+        invalidate(
+            recipe_tag(instance.pk),
+            *(tagged_tag(slug) for slug in Tag.objects.filter(
+                pk__in=pks
+            ).values_list('slug', flat=True))
+        )
+
+
+@receiver(ingredient_amounts_changed, sender=IngredientAmount)
+def invalidate_recipe_ingredients(sender, recipe_id, **kwargs):
+    invalidate(recipe_tag(recipe_id))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(sender, instance, **kwargs):
+    # Ingredient amounts are removed by cascade before post_delete.
+    instance._response_cache_recipe_ids = list(
+        instance.used_in_recipes.values_list('recipe_id', flat=True)
+    )
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_recipes(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recipe_ids = instance.__dict__.pop('_response_cache_recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = instance.used_in_recipes.values_list(
+            'recipe_id', flat=True
+        )
+    invalidate(*(recipe_tag(pk) for pk in recipe_ids))
+
+
+@receiver(pre_save, sender=Tag)
+def remember_tag_slug(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._response_cache_slug = Tag.objects.filter(
+        pk=instance.pk
+    ).values_list('slug', flat=True).first()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    slugs = {instance.slug, getattr(instance, '_response_cache_slug', None)}
+    invalidate(
+        tag_tag(instance.pk),
+        *(tagged_tag(slug) for slug in slugs if slug)
+    )
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_author(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+    if raw or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    invalidate(author_tag(instance.pk))
+
+
+@receiver(m2m_changed, sender=User.subscribes.through)
+def invalidate_followers_count(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    pks = changed_pks(
+        instance,
+        action,
+        pk_set,
+        'user_set' if reverse else 'subscribes'
+    )
+    if not pks:
+        return
+    if reverse:
+        invalidate(author_tag(instance.pk))
+    else:
+        invalidate(*(author_tag(pk) for pk in pks))
+
+
+def invalidate_recipe_counters(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    accessor = {
+        Recipe.favorited.through: 'favorited_recipes',
+        Recipe.in_shopping_cart.through: 'shopping_cart',
+    }[sender]
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate(recipe_tag(instance.pk), COUNTERS_TAG)
+        return
+    pks = changed_pks(instance, action, pk_set, accessor)
+    if pks:
+        invalidate(COUNTERS_TAG, *(recipe_tag(pk) for pk in pks))
+
+
+for relation in (Recipe.favorited.through, Recipe.in_shopping_cart.through):
+    m2m_changed.connect(invalidate_recipe_counters, sender=relation)
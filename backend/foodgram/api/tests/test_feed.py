@@ -0,0 +1,67 @@
+from unittest import mock
+
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe, TimelineEntry
+from recipes.tests.utils import create_recipe, create_user
+
+FEED_URL = '/api/recipes/feed/'
+
+
+class FeedTest(APITestCase):
+    """Feed merges timeline entries with recipes of big authors."""
+
+    def setUp(self):
+        patcher = mock.patch('recipes.timelines.FEED_FANOUT_LIMIT', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reader = create_user('reader')
+        self.small_author = create_user('small')
+        self.big_author = create_user('big')
+        create_user('other').subscribes.add(self.big_author)
+        self.reader.subscribes.add(self.small_author, self.big_author)
+        for number in range(5):
+            for author in (self.small_author, self.big_author):
+                create_recipe(author, f'{author.username} {number}')
+        self.client.force_authenticate(self.reader)
+
+    def get_pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            url = pages[-1]['next']
+        return pages
+
+    def test_pages_follow_publication_order(self):
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5
+        )
+        expected = list(
+            Recipe.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+
+        pages = self.get_pages(f'{FEED_URL}?limit=3')
+
+        self.assertEqual(
+            [recipe['id'] for page in pages for recipe in page['results']],
+            expected
+        )
+        previous = self.client.get(pages[1]['previous']).json()
+        self.assertEqual(previous['results'], pages[0]['results'])
+
+    def test_author_losing_followers_leaves_feed(self):
+        self.small_author.user_set.clear()
+
+        results = self.get_pages(FEED_URL)[0]['results']
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(
+            {recipe['author']['id'] for recipe in results},
+            {self.big_author.id}
+        )
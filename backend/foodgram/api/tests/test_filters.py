@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Tag
+from recipes.tests.utils import create_recipe, create_user
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeTagsFilterTest(APITestCase):
+    """Filtering recipes by several tag slugs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast, cls.lunch, cls.dinner = (
+            Tag.objects.create(name=slug, color=color, slug=slug)
+            for slug, color in (
+                ('breakfast', '#FFFC66'),
+                ('lunch', '#54E709'),
+                ('dinner', '#8775D2'),
+            )
+        )
+        author = create_user('author')
+        cls.both = create_recipe(author, 'Both')
+        cls.both.tags.set((cls.breakfast, cls.lunch))
+        cls.lunch_only = create_recipe(author, 'Lunch')
+        cls.lunch_only.tags.set((cls.lunch, ))
+        create_recipe(author, 'Dinner').tags.set((cls.dinner, ))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recipe_with_several_matching_tags_is_listed_once(self):
+        response = self.client.get(
+            RECIPES_URL, {'tags': ['breakfast', 'lunch']}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertCountEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.both.id, self.lunch_only.id]
+        )
+
+    def test_unknown_slug_is_rejected(self):
+        response = self.client.get(
+            RECIPES_URL, {'tags': ['lunch', 'brunch']}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.json())
@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from api.utils.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+class IngredientSearchTest(TestCase):
+    """Ingredient autocomplete served from the in-process index."""
+
+    def setUp(self):
+        ingredient_index.invalidate()
+        self.addCleanup(ingredient_index.invalidate)
+        Ingredient.objects.create(name='Salt', measurement_unit='g')
+
+    def search(self, name):
+        response = self.client.get(INGREDIENTS_URL, {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_repeated_search_does_not_query_database(self):
+        self.assertEqual(self.search('sa'), ['Salt'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('sal'), ['Salt'])
+
+    def test_saved_ingredient_is_found_after_commit(self):
+        self.search('sa')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Sage', measurement_unit='g')
+
+        self.assertEqual(self.search('sa'), ['Sage', 'Salt'])
+
+    def test_invalidated_index_keeps_snapshot_of_readers(self):
+        snapshot = ingredient_index.get_snapshot()
+
+        ingredient_index.invalidate()
+
+        self.assertEqual(
+            [entry['name'] for entry in ingredient_index.search(
+                'sa', snapshot=snapshot
+            )],
+            ['Salt']
+        )
@@ -0,0 +1,54 @@
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from api.utils import pdf_cache
+from recipes.models import Ingredient, IngredientAmount
+from recipes.tests.utils import create_recipe, create_user
+
+
+class CartFingerprintTest(TestCase):
+    """Cached shopping lists after catalogue edits."""
+
+    def setUp(self):
+        self.ingredients = Ingredient.objects.bulk_create((
+            Ingredient(name='salt', measurement_unit='g'),
+            Ingredient(name='milk', measurement_unit='ml'),
+        ))
+        self.users = []
+        for ingredient in self.ingredients:
+            user = create_user(ingredient.name)
+            recipe = create_recipe(user, ingredient.name)
+            IngredientAmount.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=5
+            )
+            user.shopping_cart.add(recipe)
+            self.users.append(user)
+
+    def test_ingredient_edit_changes_only_its_carts(self):
+        fingerprints = [
+            pdf_cache.cart_fingerprint(user) for user in self.users
+        ]
+
+        self.ingredients[0].name = 'sea salt'
+        self.ingredients[0].save()
+
+        self.assertNotEqual(
+            pdf_cache.cart_fingerprint(self.users[0]), fingerprints[0]
+        )
+        self.assertEqual(
+            pdf_cache.cart_fingerprint(self.users[1]), fingerprints[1]
+        )
+
+    def test_ingredient_edit_keeps_stored_lists(self):
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.object(
+            pdf_cache, 'SHOPPING_CART_CACHE_DIR', cache_dir
+        ):
+            fingerprint = pdf_cache.cart_fingerprint(self.users[1])
+            pdf_cache.store_pdf(fingerprint, b'pdf')
+
+            self.ingredients[0].measurement_unit = 'kg'
+            self.ingredients[0].save()
+
+            self.assertEqual(pdf_cache.get_cached_pdf(fingerprint), b'pdf')
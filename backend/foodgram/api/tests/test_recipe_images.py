@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.images import claim_recipe, process_next_recipe
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.utils import create_user
+
+RECIPES_URL = '/api/recipes/'
+
+
+def image_bytes(color):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def data_uri(content, media_type='image/png'):
+    return (f'data:{media_type};base64,'
+            f'{base64.b64encode(content).decode()}')
+
+
+class RecipeImageUploadTest(APITestCase):
+    """Base64 recipe images stored by content hash."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tag = Tag.objects.create(
+            name='lunch', color='#54E709', slug='lunch'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='salt', measurement_unit='g'
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.client.force_authenticate(self.author)
+
+    def create_recipe(self, name, image):
+        response = self.client.post(RECIPES_URL, {
+            'name': name,
+            'text': name,
+            'cooking_time': 10,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+            'image': image,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return Recipe.objects.get(pk=response.json()['id'])
+
+    def test_patch_with_same_image_keeps_derivatives(self):
+        content = image_bytes('red')
+        recipe = self.create_recipe('Soup', data_uri(content))
+        process_next_recipe()
+        recipe.refresh_from_db()
+        derivatives = recipe.image_derivatives
+
+        response = self.client.patch(
+            f'{RECIPES_URL}{recipe.id}/',
+            {'image': data_uri(content)},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        image_name = recipe.image.name
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, image_name)
+        self.assertTrue(recipe.image_processed)
+        self.assertEqual(recipe.image_derivatives, derivatives)
+        self.assertIsNone(claim_recipe())
+
+    def test_name_comes_from_content_not_from_client(self):
+        content = image_bytes('red')
+        victim_name = f'{hashlib.sha256(content).hexdigest()}.png'
+        forged = image_bytes('black')
+
+        attack = self.create_recipe(
+            'Forged',
+            data_uri(forged, media_type=f'image/x/{victim_name}')
+        )
+        honest = self.create_recipe('Honest', data_uri(content))
+
+        self.assertEqual(
+            attack.image.name,
+            f'recipes/images/{hashlib.sha256(forged).hexdigest()}.png'
+        )
+        self.assertEqual(honest.image.name, f'recipes/images/{victim_name}')
+        with honest.image.open('rb') as file:
+            self.assertEqual(file.read(), content)
+
+    def test_line_wrapped_base64_is_accepted(self):
+        content = image_bytes('red')
+        encoded = base64.b64encode(content).decode()
+        wrapped = '\n'.join(
+            encoded[start:start + 76]
+            for start in range(0, len(encoded), 76)
+        )
+
+        recipe = self.create_recipe(
+            'Wrapped', f'data:image/png;base64,{wrapped}\n'
+        )
+
+        with recipe.image.open('rb') as file:
+            self.assertEqual(file.read(), content)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_decoded_temporary_file_is_closed(self):
+        with mock.patch.object(
+            TemporaryUploadedFile, 'close', autospec=True,
+            side_effect=TemporaryUploadedFile.close
+        ) as close:
+            recipe = self.create_recipe('Large', data_uri(image_bytes('red')))
+
+        close.assert_called()
+        self.assertTrue(recipe.image.storage.exists(recipe.image.name))
+
+    def test_not_an_image_is_rejected(self):
+        recipe = self.create_recipe('Soup', data_uri(image_bytes('red')))
+
+        response = self.client.patch(
+            f'{RECIPES_URL}{recipe.id}/',
+            {'image': data_uri(b'<?php echo 1; ?>')},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
@@ -0,0 +1,128 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.serializers.recipes.serializers import CreateRecipeSerializer
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from recipes.tests.utils import create_user
+
+RECIPES_URL = '/api/recipes/'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAA'
+    'ACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNo'
+    'AAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+class RecipeWriteQueriesTest(APITestCase):
+    """Queries of recipe create and update do not grow with its size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'tag {number}', color=f'#00000{number}',
+                slug=f'tag-{number}')
+            for number in range(6)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient {number}', measurement_unit='g')
+            for number in range(20)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.author)
+        # Table version rows are created by the first write.
+        self.count_queries('post', RECIPES_URL, self.get_data(
+            'First', self.tags[:1], self.ingredients[:1]
+        ), 201)
+
+    def get_data(self, name, tags, ingredients):
+        return {
+            'name': name,
+            'text': name,
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [tag.pk for tag in tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 5}
+                for ingredient in ingredients
+            ],
+        }
+
+    def count_queries(self, method, url, data, status_code):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, status_code, response.content)
+        self.version_bumps = sum(
+            'UPDATE "recipes_recipe" SET "version"' in query['sql']
+            for query in queries
+        )
+        return len(queries), response.json()
+
+    def test_create_queries(self):
+        small, _ = self.count_queries('post', RECIPES_URL, self.get_data(
+            'Small', self.tags[:1], self.ingredients[:1]
+        ), 201)
+        large, recipe = self.count_queries('post', RECIPES_URL, self.get_data(
+            'Large', self.tags[:3], self.ingredients[:10]
+        ), 201)
+
+        self.assertEqual(large, small)
+        self.assertEqual(self.version_bumps, 1)
+        self.assertEqual(len(recipe['ingredients']), 10)
+        self.assertEqual(len(recipe['tags']), 3)
+
+    def test_update_queries(self):
+        counts = []
+        for name, size, tag_count in (('Small', 1, 1), ('Large', 10, 3)):
+            _, recipe = self.count_queries('post', RECIPES_URL, self.get_data(
+                name, self.tags[:tag_count], self.ingredients[:size]
+            ), 201)
+            count, recipe = self.count_queries(
+                'patch',
+                f'{RECIPES_URL}{recipe["id"]}/',
+                self.get_data(
+                    name,
+                    self.tags[3:3 + tag_count],
+                    self.ingredients[10:10 + size]
+                ),
+                200
+            )
+            counts.append(count)
+            self.assertEqual(self.version_bumps, 1)
+            self.assertEqual(len(recipe['ingredients']), size)
+            self.assertEqual(len(recipe['tags']), tag_count)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_represent_many_queries(self):
+        Recipe.objects.bulk_create(
+            Recipe(author=self.author, name=f'Recipe {number}',
+                   text='text', cooking_time=10)
+            for number in range(10)
+        )
+        recipes = list(Recipe.objects.filter(name__startswith='Recipe'))
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient=ingredient, amount=5)
+            for recipe in recipes
+            for ingredient in self.ingredients[:3]
+        )
+
+        counts = []
+        for size in (1, len(recipes)):
+            cache.clear()
+            request = APIRequestFactory().get(RECIPES_URL)
+            request.user = self.author
+            with CaptureQueriesContext(connection) as queries:
+                data = CreateRecipeSerializer(
+                    recipes[:size],
+                    many=True,
+                    context={'request': request}
+                ).data
+            self.assertEqual(len(data), size)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
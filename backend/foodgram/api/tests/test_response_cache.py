@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.utils import response_cache
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+})
+class ResponseCacheTest(TestCase):
+    """Keys and dependency stamps of cached anonymous responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def get_request(self, path, **extra):
+        return Request(self.factory.get(path, **extra))
+
+    def test_key_depends_on_host_and_scheme(self):
+        keys = {
+            response_cache.cache_key(self.get_request(
+                '/api/recipes/?page=2&limit=6', **extra
+            ))
+            for extra in (
+                {},
+                {'HTTP_HOST': 'example.com'},
+                {'secure': True},
+            )
+        }
+
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(
+            response_cache.cache_key(
+                self.get_request('/api/recipes/?page=2&limit=6')
+            ),
+            response_cache.cache_key(
+                self.get_request('/api/recipes/?limit=6&page=2')
+            )
+        )
+
+    def test_evicted_stamp_does_not_revalidate_entry(self):
+        tags = (response_cache.recipe_tag(1), )
+        response_cache.store_response_data(
+            'first', {}, tags, response_cache.now()
+        )
+        response_cache.store_response_data(
+            'key', {'id': 1}, tags, response_cache.now()
+        )
+        self.assertEqual(response_cache.get_response_data('key'), {'id': 1})
+
+        cache.delete(response_cache.TAG_PREFIX + tags[0])
+        response_cache.store_response_data(
+            'other', {}, tags, response_cache.now()
+        )
+
+        self.assertIsNone(response_cache.get_response_data('key'))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.utils.shopping_list_jobs import JOB_ERROR, claim_job, process_job
+from recipes.models import ShoppingListJob
+from recipes.tests.utils import create_user
+
+
+class ShoppingListJobsTest(TestCase):
+    """Claims and failures of queued shopping list renderings."""
+
+    def setUp(self):
+        self.job = ShoppingListJob.objects.create(user=create_user('user'))
+
+    def test_rendering_job_is_taken_again_after_timeout(self):
+        self.assertEqual(claim_job().pk, self.job.pk)
+        self.assertIsNone(claim_job())
+
+        ShoppingListJob.objects.filter(pk=self.job.pk).update(
+            started_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(claim_job().pk, self.job.pk)
+
+    @mock.patch(
+        'api.utils.shopping_list_jobs.make_pdf',
+        side_effect=RuntimeError('/srv/secret/fonts missing')
+    )
+    def test_failure_hides_error_details(self, make_pdf):
+        job = claim_job()
+
+        with self.assertLogs('api.utils.shopping_list_jobs', 'ERROR'):
+            with self.assertRaises(RuntimeError):
+                process_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ShoppingListJob.FAILED)
+        self.assertEqual(job.error, JOB_ERROR)
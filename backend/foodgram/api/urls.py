@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from api.views.recipes.views import (IngredientViewSet, RecipeViewSet,
                                      TagViewSet)
+from api.views.metrics.views import MetricsView
 from api.views.users.views import CustomUserViewSet
 
 app_name = 'api'
@@ -31,6 +32,7 @@ router.register(
 )
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path(r'auth/', include('djoser.urls.authtoken'))
@@ -0,0 +1,50 @@
+from django.db import transaction
+
+ADDED = 'added'
+ALREADY_ADDED = 'already_added'
+REMOVED = 'removed'
+NOT_ADDED = 'not_added'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+
+
+@transaction.atomic
+def apply_batch(related, model, ids, add, excluded=()):
+    """
+    Add objects with given ids to related manager or remove them from it.
+    Related manager does one multi-row insert, ignoring conflicts,
+    or one delete by ids and sends m2m_changed, so stored counters
+    and cart totals stay consistent.
+    Returns status of every requested id, in request order.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = set(
+        model.objects.filter(pk__in=ids).exclude(
+            pk__in=excluded
+        ).values_list('pk', flat=True)
+    )
+    related_ids = set(
+        related.filter(pk__in=found).values_list('pk', flat=True)
+    )
+
+    if add:
+        changed = found - related_ids
+        if changed:
+            related.add(*changed)
+        statuses = (ADDED, ALREADY_ADDED)
+    else:
+        changed = found & related_ids
+        if changed:
+            related.remove(*changed)
+        statuses = (REMOVED, NOT_ADDED)
+
+    results = []
+    for pk in ids:
+        if pk in excluded:
+            status = NOT_ALLOWED
+        elif pk not in found:
+            status = NOT_FOUND
+        else:
+            status = statuses[0] if pk in changed else statuses[1]
+        results.append({'id': pk, 'status': status})
+    return results
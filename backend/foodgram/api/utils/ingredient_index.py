@@ -0,0 +1,109 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import NamedTuple
+
+from foodgram.settings import (INGREDIENT_INDEX_TTL,
+                               INGREDIENT_SEARCH_SUBSTRING)
+from recipes.models import Ingredient, TableVersion
+
+
+def normalize(name):
+    """Case-folded ingredient name, with ё treated as е."""
+    return name.casefold().replace('ё', 'е')
+
+
+class IndexSnapshot(NamedTuple):
+    """Index state, published with one assignment."""
+    keys: list
+    entries: list
+    version: int
+    checked_at: float
+
+
+class IngredientIndex:
+    """
+    Per-process prefix index over ingredient names.
+    Entries are sorted by normalized name, so prefix lookups are bisect
+    over the keys and exact matches come first in each prefix range.
+    Ingredient table version is checked at most once per ttl,
+    so searches are served without touching the database.
+    """
+
+    def __init__(self, ttl=INGREDIENT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _is_fresh(self, snapshot):
+        return (
+            snapshot is not None
+            and time.monotonic() - snapshot.checked_at < self.ttl
+        )
+
+    def _build(self, version):
+        rows = Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        entries = sorted(
+            (normalize(name), name, pk, unit)
+            for pk, name, unit in rows
+        )
+        return IndexSnapshot(
+            keys=[key for key, *_ in entries],
+            entries=[
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for _, name, pk, unit in entries
+            ],
+            version=version,
+            checked_at=time.monotonic()
+        )
+
+    def get_snapshot(self):
+        """Current index, rebuilt only if ingredient table has changed."""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            version, = TableVersion.get_versions((Ingredient._meta.label, ))
+            if snapshot is not None and snapshot.version == version:
+                snapshot = snapshot._replace(checked_at=time.monotonic())
+            else:
+                snapshot = self._build(version)
+            self._snapshot = snapshot
+            return snapshot
+
+    def search(self, query, limit=None, snapshot=None,
+               substring=INGREDIENT_SEARCH_SUBSTRING):
+        """
+        Ingredients, whose name starts with query: exact matches,
+        then prefix matches, then substring matches if enabled.
+        """
+        keys, entries, *_ = snapshot or self.get_snapshot()
+        query = normalize(query)
+
+        position = bisect_left(keys, query)
+        matched = []
+        while (
+            position < len(keys)
+            and keys[position].startswith(query)
+            and (limit is None or len(matched) < limit)
+        ):
+            matched.append(entries[position])
+            position += 1
+
+        if substring and query and (limit is None or len(matched) < limit):
+            for key, entry in zip(keys, entries):
+                if limit is not None and len(matched) >= limit:
+                    break
+                if query in key and not key.startswith(query):
+                    matched.append(entry)
+
+        return matched
+
+
+ingredient_index = IngredientIndex()
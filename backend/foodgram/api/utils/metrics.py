@@ -0,0 +1,112 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Cumulative-on-export histogram with fixed buckets. """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def export(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            )
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+        self.responses = defaultdict(int)
+
+
+class MetricsRegistry:
+    """Per-process request metrics, grouped by route. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(RouteMetrics)
+
+    def observe(self, route, method, status, seconds, queries,
+                query_seconds, response_bytes):
+        with self._lock:
+            metrics = self._routes[(route, method)]
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(queries)
+            metrics.query_seconds += query_seconds
+            metrics.response_bytes += response_bytes
+            metrics.responses[status] += 1
+
+    def export(self):
+        """Metrics in Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            latency, queries, query_seconds, sizes, responses = (
+                [], [], [], [], []
+            )
+            for (route, method), metrics in routes:
+                labels = f'route="{route}",method="{method}"'
+                latency += metrics.latency.export(
+                    'foodgram_request_duration_seconds', labels
+                )
+                queries += metrics.queries.export(
+                    'foodgram_request_db_queries', labels
+                )
+                query_seconds.append(
+                    f'foodgram_db_query_seconds_total{{{labels}}} '
+                    f'{metrics.query_seconds}'
+                )
+                sizes.append(
+                    f'foodgram_response_bytes_total{{{labels}}} '
+                    f'{metrics.response_bytes}'
+                )
+                for status, count in sorted(metrics.responses.items()):
+                    responses.append(
+                        f'foodgram_responses_total'
+                        f'{{{labels},status="{status}"}} {count}'
+                    )
+
+        return '\n'.join((
+            '# TYPE foodgram_request_duration_seconds histogram',
+            *latency,
+            '# TYPE foodgram_request_db_queries histogram',
+            *queries,
+            '# TYPE foodgram_db_query_seconds_total counter',
+            *query_seconds,
+            '# TYPE foodgram_response_bytes_total counter',
+            *sizes,
+            '# TYPE foodgram_responses_total counter',
+            *responses,
+        )) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+
+from foodgram.settings import (SHOPPING_CART_CACHE_DIR,
+                               SHOPPING_CART_CACHE_MAX_ENTRIES,
+                               SHOPPING_CART_CACHE_MAX_SIZE)
+from recipes.models import CartIngredientTotal
+
+CACHE_FILE_SUFFIX = '.pdf'
+
+
+def cart_fingerprint(user):
+    """
+    Fingerprint of user shopping cart, built from ingredient totals
+    of carted recipes and the ingredient names and units printed
+    with them. Lists outdated by catalogue edits are never matched
+    again and age out of the cache.
+    """
+    rows = CartIngredientTotal.objects.filter(
+        user=user
+    ).order_by('ingredient_id').values_list(
+        'ingredient_id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'total_amount'
+    )
+
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(fingerprint):
+    return os.path.join(
+        SHOPPING_CART_CACHE_DIR,
+        fingerprint + CACHE_FILE_SUFFIX
+    )
+
+
+def get_cached_pdf(fingerprint):
+    """Return stored pdf bytes or None, marking the entry as recently used."""
+    path = _cache_path(fingerprint)
+    try:
+        with open(path, 'rb') as pdf_file:
+            pdf = pdf_file.read()
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return pdf
+
+
+def store_pdf(fingerprint, pdf):
+    """Atomically store pdf bytes and evict least recently used entries."""
+    os.makedirs(SHOPPING_CART_CACHE_DIR, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=SHOPPING_CART_CACHE_DIR)
+    with os.fdopen(descriptor, 'wb') as temp_file:
+        temp_file.write(pdf)
+    os.replace(temp_path, _cache_path(fingerprint))
+    evict()
+
+
+def evict(max_size=SHOPPING_CART_CACHE_MAX_SIZE,
+          max_entries=SHOPPING_CART_CACHE_MAX_ENTRIES):
+    """Drop oldest entries until cache fits into size and entries limits."""
+    if not os.path.isdir(SHOPPING_CART_CACHE_DIR):
+        return
+    entries = []
+    with os.scandir(SHOPPING_CART_CACHE_DIR) as directory:
+        for entry in directory:
+            if not entry.name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    while entries and (
+        total_size > max_size or len(entries) > max_entries
+    ):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
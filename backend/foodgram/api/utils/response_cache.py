@@ -0,0 +1,102 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.settings import RECIPE_RESPONSE_CACHE_TIMEOUT
+
+RESPONSE_PREFIX = 'response:'
+TAG_PREFIX = 'response-tag:'
+RECIPES_TAG = 'recipes'
+COUNTERS_TAG = 'counters'
+SEARCH_TAG = 'search'
+
+
+def recipe_tag(pk):
+    return f'recipe:{pk}'
+
+
+def author_tag(pk):
+    return f'author:{pk}'
+
+
+def tag_tag(pk):
+    return f'tag:{pk}'
+
+
+def tagged_tag(slug):
+    return f'tagged:{slug}'
+
+
+def cache_key(request):
+    """
+    Cache key of request URL with sorted query parameters.
+    Scheme and host are part of it, since responses hold absolute URLs.
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    url = f'{request.build_absolute_uri(request.path)}?{urlencode(params)}'
+    return RESPONSE_PREFIX + hashlib.sha1(url.encode()).hexdigest()
+
+
+def _tag_keys(tags):
+    return {TAG_PREFIX + tag: tag for tag in tags}
+
+
+def get_response_data(key):
+    """
+    Cached response data or None.
+    Entry is valid while none of its dependency tags was invalidated.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    current = cache.get_many(_tag_keys(entry['tags']).keys())
+    for tag, stamp in entry['tags'].items():
+        if current.get(TAG_PREFIX + tag) != stamp:
+            return None
+    return entry['data']
+
+
+def store_response_data(key, data, tags, started):
+    """
+    Store response data with dependency tags.
+    Nothing is stored, if any tag was invalidated after the response
+    started to be built, since data may be already stale.
+    """
+    tag_keys = _tag_keys(tags)
+    for tag_key in tag_keys:
+        # Evicted stamp may have hidden an invalidation, so a new one
+        # starts now and never matches entries stored before.
+        cache.add(tag_key, now(), timeout=None)
+    stamps = cache.get_many(tag_keys.keys())
+    if len(stamps) != len(tag_keys) or any(
+        stamp > started for stamp in stamps.values()
+    ):
+        return
+    entry = {
+        'tags': {tag: stamps[tag_key] for tag_key, tag in tag_keys.items()},
+        'data': data,
+    }
+    cache.set(key, entry, timeout=RECIPE_RESPONSE_CACHE_TIMEOUT)
+
+
+def now():
+    return time.time_ns()
+
+
+def invalidate(*tags):
+    """Invalidate entries depending on any of tags, after commit."""
+    if not tags:
+        return
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {tag_key: now() for tag_key in _tag_keys(tags)},
+            timeout=None
+        )
+    )
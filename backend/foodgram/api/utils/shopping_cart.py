@@ -1,10 +1,11 @@
+import csv
 from io import BytesIO
 
-from django.db.models import CharField, Sum
-from django.db.models.functions import Cast
 from xhtml2pdf import pisa
 
+from api.utils import pdf_cache
 from foodgram.settings import ENCODING, PATH_TO_FONTS
+from recipes.models import CartIngredientTotal
 
 
 HTML_TEMPLATE = """
@@ -24,28 +25,56 @@ HTML_TEMPLATE = """
     """
 
 
+CSV_HEADER = ('name', 'amount', 'measurement_unit')
+
+
+def get_shopping_list(user):
+    """Ingredient totals of recipes in user shopping cart."""
+    return CartIngredientTotal.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'total_amount'
+    ).order_by('ingredient__name')
+
+
+def iter_shopping_list_text(user):
+    """Yield shopping list as plain text lines."""
+    for amounts in get_shopping_list(user).iterator():
+        yield (f"{amounts['ingredient__name']} - "
+               f"{amounts['total_amount']} "
+               f"{amounts['ingredient__measurement_unit']}\n")
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer, returns written value. """
+
+    def write(self, value):
+        return value
+
+
+def iter_shopping_list_csv(user):
+    """Yield shopping list as csv rows."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for amounts in get_shopping_list(user).iterator():
+        yield writer.writerow((
+            amounts['ingredient__name'],
+            amounts['total_amount'],
+            amounts['ingredient__measurement_unit'],
+        ))
+
+
 def make_pdf(user):
     """Function, what creates pdf-file from sql-data"""
-    carted_recipes = user.shopping_cart.all()
-
-    ingredient_list = carted_recipes.values(
-        'ingredients__name',
-        'ingredients__measurement_unit'
-    )
-    ingredient_list_amount = ingredient_list.annotate(
-        formatted_decimal=Cast(
-            Sum('ingredients__used_in_recipes__amount'),
-            CharField(max_length=10)
-        ),
-    )
+    ingredient_list_amount = get_shopping_list(user)
 
     formatted_list = []
 
     for amounts in ingredient_list_amount:
         formatted_string = f"""
-            <li> {amounts['ingredients__name']}
-            - {amounts['formatted_decimal']}
-            {amounts['ingredients__measurement_unit']} </li>
+            <li> {amounts['ingredient__name']}
+            - {amounts['total_amount']}
+            {amounts['ingredient__measurement_unit']} </li>
             """
         formatted_list.append(formatted_string)
 
@@ -67,3 +96,13 @@ def make_pdf(user):
     buffer.close()
 
     return pdf
+
+
+def get_shopping_cart_pdf(user):
+    """Return pdf for user shopping cart, rendering it only on cache miss."""
+    fingerprint = pdf_cache.cart_fingerprint(user)
+    pdf = pdf_cache.get_cached_pdf(fingerprint)
+    if pdf is None:
+        pdf = make_pdf(user)
+        pdf_cache.store_pdf(fingerprint, pdf)
+    return pdf
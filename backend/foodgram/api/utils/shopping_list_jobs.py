@@ -0,0 +1,90 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.utils import pdf_cache
+from api.utils.shopping_cart import make_pdf
+from foodgram.settings import SHOPPING_LIST_JOB_TIMEOUT, SHOPPING_LIST_JOB_TTL
+from recipes.models import ShoppingListJob
+
+logger = logging.getLogger(__name__)
+
+JOB_ERROR = 'Shopping list could not be rendered, please try again.'
+
+
+def enqueue_job(user):
+    """
+    Create shopping list job for user.
+    Job is completed at once when the list is already rendered.
+    """
+    fingerprint = pdf_cache.cart_fingerprint(user)
+    pdf = pdf_cache.get_cached_pdf(fingerprint)
+    if pdf is None:
+        return ShoppingListJob.objects.create(user=user)
+    return ShoppingListJob.objects.create(
+        user=user,
+        status=ShoppingListJob.DONE,
+        progress=100,
+        result=pdf
+    )
+
+
+def claim_job():
+    """
+    Mark the oldest pending job as rendering and return it.
+    Jobs rendering longer than SHOPPING_LIST_JOB_TIMEOUT seconds
+    were left by a crashed worker and are taken again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=SHOPPING_LIST_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = ShoppingListJob.objects.select_for_update(
+            skip_locked=True,
+            of=('self', )
+        ).filter(
+            Q(status=ShoppingListJob.PENDING)
+            | Q(status=ShoppingListJob.RENDERING, started_at__lt=stale)
+        ).select_related('user').first()
+        if job is None:
+            return None
+        job.status = ShoppingListJob.RENDERING
+        job.progress = 10
+        job.started_at = now
+        job.save(
+            update_fields=('status', 'progress', 'started_at', 'updated_at')
+        )
+    return job
+
+
+def process_job(job):
+    """Render shopping list of the job owner and store the result."""
+    try:
+        fingerprint = pdf_cache.cart_fingerprint(job.user)
+        pdf = pdf_cache.get_cached_pdf(fingerprint)
+        if pdf is None:
+            job.progress = 50
+            job.save(update_fields=('progress', 'updated_at'))
+            pdf = make_pdf(job.user)
+            pdf_cache.store_pdf(fingerprint, pdf)
+    except Exception:
+        # Error details stay in the log, clients see a generic message.
+        logger.exception('Shopping list job %s failed', job.id)
+        job.status = ShoppingListJob.FAILED
+        job.error = JOB_ERROR
+        job.save(update_fields=('status', 'error', 'updated_at'))
+        raise
+
+    job.status = ShoppingListJob.DONE
+    job.progress = 100
+    job.result = pdf
+    job.save(update_fields=('status', 'progress', 'result', 'updated_at'))
+    return job
+
+
+def delete_expired_jobs():
+    """Remove jobs older than SHOPPING_LIST_JOB_TTL seconds. """
+    expired = timezone.now() - timedelta(seconds=SHOPPING_LIST_JOB_TTL)
+    ShoppingListJob.objects.filter(created_at__lt=expired).delete()
@@ -0,0 +1,15 @@
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from api.utils.metrics import registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsView(APIView):
+    """Request metrics of current process in Prometheus format. """
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        return HttpResponse(registry.export(), content_type=CONTENT_TYPE)
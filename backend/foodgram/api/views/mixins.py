@@ -0,0 +1,87 @@
+import hashlib
+from abc import ABCMeta, abstractmethod
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.utils import response_cache
+from recipes.models import TableVersion
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags for list and retrieve actions,
+    built from change counters of etag_tables.
+    """
+    etag_tables = ()
+
+    def get_etag_parts(self, request):
+        self.table_versions = TableVersion.get_versions(self.etag_tables)
+        return (self.action, request.get_full_path(), *self.table_versions)
+
+    def get_etag(self, request):
+        parts = ':'.join(str(part) for part in self.get_etag_parts(request))
+        return f'"{hashlib.sha1(parts.encode()).hexdigest()}"'
+
+    def conditional_get(self, request, handler, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(
+            request,
+            super().retrieve,
+            *args,
+            **kwargs
+        )
+
+
+class AnonymousCacheMixin(metaclass=ABCMeta):
+    """
+    Cache of list and retrieve responses for anonymous users,
+    keyed on normalized query string.
+    Entries are invalidated by dependency tags from get_cache_tags.
+    """
+
+    @abstractmethod
+    def get_cache_tags(self, request, data):
+        """Dependency tags of response data."""
+
+    def cached_get(self, request, handler, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        key = response_cache.cache_key(request)
+        data = response_cache.get_response_data(key)
+        if data is not None:
+            return Response(data)
+
+        started = response_cache.now()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.store_response_data(
+                key,
+                response.data,
+                self.get_cache_tags(request, response.data),
+                started
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_get(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_get(request, super().retrieve, *args, **kwargs)
@@ -1,5 +1,135 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.settings import REST_FRAMEWORK
+from recipes.timelines import feed_sources
+
+CURSOR_PAGINATION = 'cursor'
 
 
 class RecipesPagination(PageNumberPagination):
     page_size_query_param = "limit"
+
+
+class RecipesCursorPagination(BasePagination):
+    """
+    Keyset pagination over (pub_date, id),
+    without COUNT and OFFSET queries.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def get_page_size(self, request):
+        limit = request.query_params.get(self.page_size_query_param)
+        if limit and limit.isdigit() and int(limit) > 0:
+            return min(int(limit), self.max_page_size)
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            return (
+                datetime.fromisoformat(cursor['pub_date']),
+                int(cursor['id']),
+                bool(cursor['reverse'])
+            )
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, recipe, reverse):
+        cursor = json.dumps({
+            'pub_date': recipe.pub_date.isoformat(),
+            'id': recipe.id,
+            'reverse': reverse
+        })
+        encoded = urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded
+        )
+
+    def keyset_filter(self, cursor, id_field='id'):
+        """Rows after cursor position in its direction."""
+        pub_date, pk, reverse = cursor
+        lookup = 'gt' if reverse else 'lt'
+        return (
+            Q(**{f'pub_date__{lookup}': pub_date})
+            | Q(**{'pub_date': pub_date, f'{id_field}__{lookup}': pk})
+        )
+
+    def keyset_ordering(self, cursor, id_field='id'):
+        if cursor is not None and cursor[2]:
+            return ('pub_date', id_field)
+        return ('-pub_date', f'-{id_field}')
+
+    def get_rows(self, queryset, cursor, limit):
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(cursor))
+        return list(
+            queryset.order_by(*self.keyset_ordering(cursor))[:limit]
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+
+        results = self.get_rows(queryset, cursor, page_size + 1)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next = self.previous = None
+        if results:
+            if has_more or reverse:
+                self.next = self.encode_cursor(results[-1], reverse=False)
+            if cursor is not None and (has_more or not reverse):
+                self.previous = self.encode_cursor(results[0], reverse=True)
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next,
+            'previous': self.previous,
+            'results': data
+        })
+
+
+class FeedCursorPagination(RecipesCursorPagination):
+    """
+    Keyset pagination of subscription feed.
+    Page keys come from UNION ALL of feed sources,
+    recipes of the page are then loaded from queryset by id.
+    """
+
+    def get_rows(self, queryset, cursor, limit):
+        sources = feed_sources(self.request.user)
+        if cursor is not None:
+            sources = (
+                sources[0].filter(self.keyset_filter(cursor, 'recipe_id')),
+                sources[1].filter(self.keyset_filter(cursor)),
+            )
+        keys = sources[0].union(sources[1], all=True).order_by(
+            *self.keyset_ordering(cursor, 'recipe_id')
+        )[:limit]
+        recipe_ids = [recipe_id for _, recipe_id in keys]
+        recipes = queryset.in_bulk(recipe_ids)
+        return [recipes[pk] for pk in recipe_ids if pk in recipes]
@@ -1,29 +1,45 @@
-import base64
-
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from api.serializers.recipes.filters import IngredientFilter, RecipeFilter
 from api.serializers.recipes.permissions import (IsAdminOrReadOnly,
                                                  IsAuthorOrReadOnly)
-from api.serializers.recipes.renderers import PdfRenderer
+from api.serializers.recipes.renderers import (CsvRenderer, PdfRenderer,
+                                               StreamingShoppingListRenderer,
+                                               TextRenderer)
 from api.serializers.recipes.serializers import (CreateRecipeSerializer,
                                                  IngredientSerializer,
+                                                 RecipeSerializer,
+                                                 ShoppingListJobSerializer,
                                                  TagSerializer)
+from api.serializers.users.serializers import (BatchSerializer,
+                                               UserRecipeSerializer)
 from api.serializers.recipes.renderers import CONTENT_TYPE
-from api.views.recipes.pagination import RecipesPagination
-from recipes.models import Ingredient, Recipe, Tag
+from api.utils.batch import apply_batch
+from api.utils.ingredient_index import ingredient_index
+from api.utils.shopping_list_jobs import enqueue_job
+from api.utils import response_cache
+from api.views.mixins import AnonymousCacheMixin, ConditionalGetMixin
+from api.views.recipes.pagination import (CURSOR_PAGINATION,
+                                          FeedCursorPagination,
+                                          RecipesCursorPagination,
+                                          RecipesPagination)
+from foodgram.settings import INGREDIENT_SEARCH_LIMIT
+from recipes.models import Ingredient, Recipe, ShoppingListJob, Tag
+from users.models import User
 
 DATE_FORMAT = '%Y-%m-%d'
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Ingredient model viewset. """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -31,17 +47,48 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    etag_tables = (Ingredient._meta.label, )
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('name') is None:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_get(request, self.search)
+
+    def get_etag_parts(self, request):
+        if request.query_params.get('name') is None:
+            return super().get_etag_parts(request)
+        # Index checks table version itself, at most once per ttl.
+        self.index_snapshot = ingredient_index.get_snapshot()
+        return (
+            self.action,
+            request.get_full_path(),
+            self.index_snapshot.version
+        )
 
+    def search(self, request):
+        limit = request.query_params.get('limit')
+        if limit and limit.isdigit():
+            limit = int(limit)
+        else:
+            limit = INGREDIENT_SEARCH_LIMIT
+        return Response(ingredient_index.search(
+            request.query_params['name'],
+            limit=limit,
+            snapshot=self.index_snapshot
+        ))
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Tag model viewset. """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+    etag_tables = (Tag._meta.label, )
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
     """Viewset for /recipes, /shopping_cart and /favorites. """
     permission_classes = (
         IsAuthorOrReadOnly | IsAdminOrReadOnly,
@@ -51,115 +98,289 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = RecipesPagination
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = RecipeFilter
-    ordering_fields = ('created_at', 'updated_at')
+    ordering_fields = ('pub_date', 'favorites_count', 'in_cart_count')
     http_method_names = ('get', 'post', 'patch', 'delete')
+    etag_tables = (
+        Recipe._meta.label,
+        Tag._meta.label,
+        Ingredient._meta.label,
+        User._meta.label,
+        Recipe.favorited.through._meta.label,
+        Recipe.in_shopping_cart.through._meta.label,
+        User.subscribes.through._meta.label,
+    )
+
+    def get_etag_parts(self, request):
+        return (request.user.pk, *super().get_etag_parts(request))
+
+    def get_cache_tags(self, request, data):
+        """
+        Recipes, authors and tags shown in response,
+        and what decides, which recipes get into the list.
+        """
+        recipes = data['results'] if self.action == 'list' else (data, )
+        tags = set()
+        for recipe in recipes:
+            tags.add(response_cache.recipe_tag(recipe['id']))
+            tags.add(response_cache.author_tag(recipe['author']['id']))
+            tags.update(
+                response_cache.tag_tag(tag['id']) for tag in recipe['tags']
+            )
+        if self.action != 'list':
+            return tags
+
+        params = request.query_params
+        if 'author' in params:
+            tags.add(response_cache.author_tag(params['author']))
+        tags.update(
+            response_cache.tagged_tag(slug)
+            for slug in params.getlist('tags')
+        )
+        if not ('author' in params or 'tags' in params):
+            tags.add(response_cache.RECIPES_TAG)
+        if 'search' in params:
+            tags.add(response_cache.SEARCH_TAG)
+        if params.keys() & {'ordering', 'is_favorited', 'is_in_shopping_cart'}:
+            tags.add(response_cache.COUNTERS_TAG)
+        return tags
+
+    @property
+    def paginator(self):
+        """
+        Page number pagination by default,
+        keyset pagination with ?pagination=cursor or ?cursor=.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if (
+                params.get('pagination') == CURSOR_PAGINATION
+                or 'cursor' in params
+            ):
+                if 'search' in params:
+                    # Keyset order would replace rank order silently.
+                    raise ValidationError({
+                        'search': 'Search results are ordered by rank '
+                                  'and support only page pagination.'
+                    })
+                self._paginator = RecipesCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        # Tags and ingredients are loaded only for recipes,
+        # whose cached fragment is missing.
+        return Recipe.objects.select_related('author').with_user_flags(
+            self.request.user
+        )
+
+    def get_serializer_class(self):
+        if self.request.method in SAFE_METHODS:
+            return RecipeSerializer
+        return CreateRecipeSerializer
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({'request': self.request})
+        if self.action in ('list', 'feed'):
+            context['image_size'] = 'card'
         return context
 
-    @action(
-        methods=('GET', ),
-        renderer_classes=(PdfRenderer, ),
-        url_path='download_shopping_cart',
-        detail=False,
-        permission_classes=(IsAuthenticated, )
-    )
-    def download_shopping_cart(self, request):
+    def get_renderers(self):
+        if (
+            self.action == 'download_shopping_cart'
+            and self.request.method == 'POST'
+        ):
+            return (JSONRenderer(), )
+        return super().get_renderers()
+
+    def _shopping_list_response(self, content, user,
+                                response_class=HttpResponse,
+                                content_type=CONTENT_TYPE,
+                                extension='pdf'):
         now = timezone.now()
         time = now.strftime(DATE_FORMAT)
-        pdf_data = {
-            'user': request.user,
-        }
-        response = HttpResponse(
-            content_type=CONTENT_TYPE,
+        return response_class(
+            content,
+            content_type=content_type,
             headers={
                 'Content-Disposition': ('attachment; '
                                         'filename="shopping_list'
                                         f'_{time}_'
-                                        f'{request.user.username}.pdf"')}
+                                        f'{user.username}.{extension}"')}
         )
-        response.write(PdfRenderer().render(pdf_data))
-        return response
 
     @action(
-        methods=('POST', 'DELETE'),
-        url_path='shopping_cart',
-        detail=True,
+        methods=('GET', 'POST'),
+        renderer_classes=(PdfRenderer, TextRenderer, CsvRenderer),
+        url_path='download_shopping_cart',
+        detail=False,
         permission_classes=(IsAuthenticated, )
     )
-    def add_to_shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-
-        with open(recipe.image.path, 'rb') as image_file:
-            encoded_image = base64.b64encode(image_file.read())
-
+    def download_shopping_cart(self, request):
         if request.method == 'POST':
-            if recipe in user.shopping_cart.all():
-                return Response(
-                    {'message': 'Recipe already in shopping cart.'}
-                )
-
-            user.shopping_cart.add(recipe)
-
-            return Response(
-                {
-                    'id': recipe.id,
-                    'name': recipe.name,
-                    'image': encoded_image,
-                    'cooking_time': recipe.cooking_time
-                },
-                status=status.HTTP_201_CREATED
+            job = enqueue_job(request.user)
+            serializer = ShoppingListJobSerializer(
+                job,
+                context={'request': request}
             )
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
-        if recipe not in user.shopping_cart.all():
-            return Response(
-                {'message': 'Not in shopping cart.'}
+        renderer = request.accepted_renderer
+        if isinstance(renderer, StreamingShoppingListRenderer):
+            return self._shopping_list_response(
+                renderer.stream(request.user),
+                request.user,
+                response_class=StreamingHttpResponse,
+                content_type=f'{renderer.media_type}; '
+                             f'charset={renderer.charset}',
+                extension=renderer.format
             )
 
-        request.user.shopping_cart.remove(recipe)
+        pdf_data = {
+            'user': request.user,
+        }
+        return self._shopping_list_response(
+            PdfRenderer().render(pdf_data),
+            request.user
+        )
 
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    @action(
+        methods=('GET', ),
+        url_path=r'download_shopping_cart/(?P<job_id>[0-9a-f-]+)',
+        url_name='shopping-list-job',
+        detail=False,
+        permission_classes=(IsAuthenticated, )
+    )
+    def shopping_list_job(self, request, job_id=None):
+        job = get_object_or_404(
+            ShoppingListJob.objects.defer('result'),
+            pk=job_id,
+            user=request.user
+        )
+        serializer = ShoppingListJobSerializer(
+            job,
+            context={'request': request}
+        )
+        return Response(serializer.data)
 
     @action(
-        methods=('POST', 'DELETE'),
-        detail=True,
-        url_path='favorite',
+        methods=('GET', ),
+        url_path=r'download_shopping_cart/(?P<job_id>[0-9a-f-]+)/file',
+        url_name='shopping-list-file',
+        detail=False,
         permission_classes=(IsAuthenticated, )
     )
-    def favorites(self, request, pk=None):
+    def shopping_list_file(self, request, job_id=None):
+        job = get_object_or_404(
+            ShoppingListJob,
+            pk=job_id,
+            user=request.user,
+            status=ShoppingListJob.DONE
+        )
+        return self._shopping_list_response(bytes(job.result), request.user)
 
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
+    @action(
+        methods=('GET', ),
+        detail=False,
+        url_path='feed',
+        permission_classes=(IsAuthenticated, )
+    )
+    def feed(self, request):
+        """Recipes of followed authors, newest first, paginated by cursor."""
+        queryset = Recipe.objects.select_related('author').with_user_flags(
+            request.user
+        )
+        paginator = FeedCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = RecipeSerializer(
+            page,
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
 
-        with open(recipe.image.path, 'rb') as image_file:
-            encoded_image = base64.b64encode(image_file.read())
+    def _toggle_user_recipe(self, request, pk, related_name,
+                            exists_message, missing_message):
+        """Add or remove recipe from one of user recipe relations. """
+        recipe = get_object_or_404(Recipe, pk=pk)
+        related_recipes = getattr(request.user, related_name)
+        is_related = related_recipes.filter(pk=recipe.pk).exists()
 
         if request.method == 'POST':
-            if recipe in user.favorited_recipes.all():
-                return Response(
-                    {'message': 'Already in your favorites.'}
-                )
-
-            user.favorited_recipes.add(recipe)
-
-            return Response(
-                {
-                    'id': recipe.id,
-                    'name': recipe.name,
-                    'image': encoded_image,
-                    'cooking_time': recipe.cooking_time
-                },
-                status=status.HTTP_201_CREATED
-            )
+            if is_related:
+                return Response({'message': exists_message})
 
-        if recipe not in user.favorited_recipes.all():
-            return Response(
-                {'message': 'Not favorited.'}
+            related_recipes.add(recipe)
+            serializer = UserRecipeSerializer(
+                recipe,
+                context={'request': request}
             )
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if not is_related:
+            return Response({'message': missing_message})
 
-        user.favorited_recipes.remove(recipe)
+        related_recipes.remove(recipe)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _batch_user_recipes(self, request, related_name):
+        """Add or remove several recipes from one of user relations. """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_batch(
+            getattr(request.user, related_name),
+            Recipe,
+            serializer.validated_data['ids'],
+            add=request.method == 'POST'
+        )
+        return Response({'results': results})
+
+    @action(
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        detail=False,
+        permission_classes=(IsAuthenticated, )
+    )
+    def batch_shopping_cart(self, request):
+        return self._batch_user_recipes(request, 'shopping_cart')
+
+    @action(
+        methods=('POST', 'DELETE'),
+        url_path='favorite',
+        detail=False,
+        permission_classes=(IsAuthenticated, )
+    )
+    def batch_favorites(self, request):
+        return self._batch_user_recipes(request, 'favorited_recipes')
+
+    @action(
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        detail=True,
+        permission_classes=(IsAuthenticated, )
+    )
+    def add_to_shopping_cart(self, request, pk=None):
+        return self._toggle_user_recipe(
+            request,
+            pk,
+            related_name='shopping_cart',
+            exists_message='Recipe already in shopping cart.',
+            missing_message='Not in shopping cart.'
+        )
+
+    @action(
+        methods=('POST', 'DELETE'),
+        detail=True,
+        url_path='favorite',
+        permission_classes=(IsAuthenticated, )
+    )
+    def favorites(self, request, pk=None):
+        return self._toggle_user_recipe(
+            request,
+            pk,
+            related_name='favorited_recipes',
+            exists_message='Already in your favorites.',
+            missing_message='Not favorited.'
+        )
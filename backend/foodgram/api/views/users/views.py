@@ -1,15 +1,20 @@
 from http import HTTPStatus
 
+from django.db.models import F, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.serializers.users.serializers import (SubscriptionsSerializer,
+from api.serializers.users.serializers import (BatchSerializer,
+                                               SubscriptionsSerializer,
                                                UserSerializer)
+from api.utils.batch import apply_batch
+from recipes.models import Recipe
 from users.models import User
 
 
@@ -20,9 +25,47 @@ class CustomUserViewSet(UserViewSet):
     """
     serializer_class = UserSerializer
     pagination_class = LimitOffsetPagination
-    filter_backends = (SearchFilter, )
+    filter_backends = (SearchFilter, OrderingFilter)
+    ordering_fields = ('recipes_count', 'followers_count')
     permission_classes = (IsAuthenticated, )
 
+    def get_recipes_limit(self):
+        limit = self.request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            return int(limit)
+        return None
+
+    def get_subscriptions_queryset(self, queryset):
+        """
+        Authors with annotated is_subscribed,
+        their recipes are prefetched in one query,
+        limited by recipes_limit with window function.
+        """
+        recipes = Recipe.objects.only(
+            'id', 'author_id', 'name', 'image', 'image_derivatives',
+            'cooking_time', 'pub_date'
+        )
+        limit = self.get_recipes_limit()
+        if limit is not None:
+            recipes = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc())
+                )
+            ).filter(row_number__lte=limit)
+
+        return queryset.annotate(
+            is_subscribed=Value(True)
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        ).order_by('id')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['recipes_limit'] = self.get_recipes_limit()
+        return context
+
     @action(
         methods=('GET', ),
         detail=False,
@@ -30,19 +73,26 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated, )
     )
     def get_subscribes(self, request):
-        queryset = request.user.subscribes.all()
+        queryset = self.get_subscriptions_queryset(
+            request.user.subscribes.all()
+        )
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = SubscriptionsSerializer(
                 page,
                 many=True,
-                context={'request': request}
+                context=self.get_serializer_context()
             )
             return self.get_paginated_response(
                 serializer.data
             )
+        serializer = SubscriptionsSerializer(
+            queryset,
+            many=True,
+            context=self.get_serializer_context()
+        )
         return Response(
-            data=queryset.data,
+            data=serializer.data,
             status=HTTPStatus.OK
         )
 
@@ -63,10 +113,10 @@ class CustomUserViewSet(UserViewSet):
                 )
             user.subscribes.add(subscribe)
             serializer = SubscriptionsSerializer(
-                subscribe,
-                context={
-                    'request': request,
-                }
+                self.get_subscriptions_queryset(
+                    User.objects.filter(pk=subscribe.pk)
+                ).get(),
+                context=self.get_serializer_context()
             )
             return Response(
                 serializer.data, status=HTTPStatus.CREATED
@@ -79,3 +129,21 @@ class CustomUserViewSet(UserViewSet):
 
         user.subscribes.remove(subscribe)
         return Response(status=HTTPStatus.NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='subscribe',
+        permission_classes=(IsAuthenticated, )
+    )
+    def batch_subscribes(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_batch(
+            request.user.subscribes,
+            User,
+            serializer.validated_data['ids'],
+            add=request.method == 'POST',
+            excluded=(request.user.pk, )
+        )
+        return Response({'results': results})
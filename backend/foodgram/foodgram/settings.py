@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -139,3 +140,62 @@ MIN_TAGS = 1
 MAX_TAGS = 3
 PATH_TO_FONTS = BASE_DIR / 'api' / 'utils' / 'fonts' / 'font.css'
 ENCODING = 'utf-8'
+SHOPPING_CART_CACHE_DIR = os.getenv(
+    'SHOPPING_CART_CACHE_DIR',
+    os.path.join(BASE_DIR, 'cache', 'shopping_lists')
+)
+SHOPPING_CART_CACHE_MAX_SIZE = int(
+    os.getenv('SHOPPING_CART_CACHE_MAX_SIZE', 50 * 1024 * 1024)
+)
+SHOPPING_CART_CACHE_MAX_ENTRIES = int(
+    os.getenv('SHOPPING_CART_CACHE_MAX_ENTRIES', 1000)
+)
+SHOPPING_LIST_JOB_TTL = int(os.getenv('SHOPPING_LIST_JOB_TTL', 60 * 60))
+SHOPPING_LIST_JOB_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_JOB_TIMEOUT', 5 * 60)
+)
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 5 * 60))
+INGREDIENT_SEARCH_LIMIT = (
+    int(os.getenv('INGREDIENT_SEARCH_LIMIT'))
+    if os.getenv('INGREDIENT_SEARCH_LIMIT') else None
+)
+INGREDIENT_SEARCH_SUBSTRING = (
+    os.getenv('INGREDIENT_SEARCH_SUBSTRING') == 'True'
+)
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 1000))
+RECIPE_IMAGE_SIZES = {
+    'card': (600, 400),
+    'thumb': (240, 240),
+}
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', 80))
+RECIPE_IMAGE_CLAIM_TIMEOUT = int(
+    os.getenv('RECIPE_IMAGE_CLAIM_TIMEOUT', 10 * 60)
+)
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 5 * 1024 * 1024)
+)
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 100))
+# Recipe pages read many small cache entries and every process
+# must see invalidations, so production sets CACHE_LOCATION
+# to a shared Redis cache. Without it per-process local memory cache
+# is used, which suits development and tests only, as does file based
+# cache, costing a file read per key and culling by listing files.
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.redis.RedisCache'
+            if CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': CACHE_LOCATION or '',
+    }
+}
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_RESPONSE_CACHE_TIMEOUT', 5 * 60)
+)
+RECIPE_FRAGMENT_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+)
@@ -36,14 +36,14 @@ class IngredientAmountInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'id', 'author')
+    list_display = ('name', 'id', 'author', 'added_in_favorites')
     list_filter = ('tags',)
     search_fields = ('author__username', 'author__email')
     inlines = (IngredientAmountInline, )
 
     @display(description='Favorited')
     def added_in_favorites(self, obj):
-        return obj.favorited.all().count()
+        return obj.favorites_count
 
     def get_form(self, request, obj=None, **kwargs):
         if obj:
@@ -70,3 +70,8 @@ class IngrdientAmount(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
     search_fields = ('recipe__name', 'ingredient__name')
     list_filter = ('ingredient__measurement_unit', 'recipe__tags')
+
+    def delete_queryset(self, request, queryset):
+        # Row deletes send amount changes, bulk delete would not.
+        for ingredient_amount in queryset:
+            ingredient_amount.delete()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class IngredientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from recipes import signals  # noqa: F401
@@ -0,0 +1,172 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+
+from recipes.models import CartIngredientTotal, IngredientAmount, Recipe
+
+CartRelation = Recipe.in_shopping_cart.through
+
+
+def actual_totals(user_ids=None):
+    """
+    Totals aggregated from scratch: (user id, ingredient id) to amount.
+    Grouping goes from cart rows through one join to ingredient amounts,
+    so every amount is counted once per carted recipe.
+    """
+    rows = CartRelation.objects.filter(
+        recipe__recipe_ingredients__isnull=False
+    )
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    rows = rows.values(
+        'user_id', 'recipe__recipe_ingredients__ingredient_id'
+    ).annotate(
+        total=Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+    return {
+        (row['user_id'], row['recipe__recipe_ingredients__ingredient_id']):
+            row['total']
+        for row in rows.iterator()
+    }
+
+
+def stored_totals(user_ids=None):
+    rows = CartIngredientTotal.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in rows.values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        ).iterator()
+    }
+
+
+def find_drift(user_ids=None):
+    """Keys, where stored total differs from actual one, with both values."""
+    actual = actual_totals(user_ids)
+    stored = stored_totals(user_ids)
+    return {
+        key: (stored.get(key), actual.get(key))
+        for key in actual.keys() | stored.keys()
+        if stored.get(key) != actual.get(key)
+    }
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """Replace stored totals with ones aggregated from scratch."""
+    rows = CartIngredientTotal.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    rows.delete()
+    CartIngredientTotal.objects.bulk_create(
+        (
+            CartIngredientTotal(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total
+            )
+            for (user_id, ingredient_id), total in actual_totals(
+                user_ids
+            ).items()
+        ),
+        batch_size=1000
+    )
+
+
+def apply_deltas(deltas):
+    """
+    Add deltas, keyed by (user id, ingredient id), to stored totals.
+    Existing rows are locked and updated, missing ones created,
+    rows dropping to zero deleted.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    user_ids = {user_id for user_id, _ in deltas}
+    ingredient_ids = {ingredient_id for _, ingredient_id in deltas}
+    with transaction.atomic():
+        # Rows are locked in one order, so concurrent carts do not deadlock.
+        rows = {
+            (row.user_id, row.ingredient_id): row
+            for row in CartIngredientTotal.objects.select_for_update().filter(
+                user_id__in=user_ids,
+                ingredient_id__in=ingredient_ids
+            ).order_by('pk')
+            if (row.user_id, row.ingredient_id) in deltas
+        }
+        changed, emptied, created = [], [], []
+        for key, delta in deltas.items():
+            row = rows.get(key)
+            if row is None:
+                if delta > 0:
+                    created.append(
+                        CartIngredientTotal(
+                            user_id=key[0],
+                            ingredient_id=key[1],
+                            total_amount=delta
+                        )
+                    )
+                continue
+            row.total_amount += delta
+            if row.total_amount > 0:
+                changed.append(row)
+            else:
+                emptied.append(row.pk)
+
+        if changed:
+            CartIngredientTotal.objects.bulk_update(
+                changed, ('total_amount', )
+            )
+        if emptied:
+            CartIngredientTotal.objects.filter(pk__in=emptied).delete()
+        if created:
+            try:
+                with transaction.atomic():
+                    CartIngredientTotal.objects.bulk_create(created)
+            except IntegrityError:
+                # Row was created by a concurrent transaction,
+                # now it exists and can be locked and updated.
+                apply_deltas({
+                    (row.user_id, row.ingredient_id): row.total_amount
+                    for row in created
+                })
+
+
+def cart_deltas(user_ids, recipe_ids, sign=1):
+    """Deltas of adding every recipe to cart of every user, or removing."""
+    amounts = defaultdict(int)
+    for ingredient_id, amount in IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += amount
+    return {
+        (user_id, ingredient_id): sign * amount
+        for user_id in user_ids
+        for ingredient_id, amount in amounts.items()
+    }
+
+
+def change_recipe_amounts(recipe_id, amount_deltas):
+    """
+    Apply change of recipe ingredient amounts,
+    given as ingredient id to delta, to carts holding the recipe.
+    """
+    amount_deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in amount_deltas.items()
+        if delta
+    }
+    if not amount_deltas:
+        return
+    user_ids = CartRelation.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True)
+    apply_deltas({
+        (user_id, ingredient_id): delta
+        for user_id in user_ids
+        for ingredient_id, delta in amount_deltas.items()
+    })
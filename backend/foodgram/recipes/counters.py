@@ -0,0 +1,43 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe
+from users.models import User
+
+COUNTERS = {
+    'favorites_count': (Recipe, Recipe.favorited.through, 'recipe_id'),
+    'in_cart_count': (Recipe, Recipe.in_shopping_cart.through, 'recipe_id'),
+    'recipes_count': (User, Recipe, 'author_id'),
+    'followers_count': (User, User.subscribes.through, 'to_user_id'),
+}
+
+
+def actual_count(source, field):
+    """Subquery, counting source rows pointing at outer row."""
+    return Coalesce(
+        Subquery(
+            source.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+def recount(counter, pks=None):
+    """Set counter to the actual value for given rows or for all of them."""
+    model, source, field = COUNTERS[counter]
+    queryset = model.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return queryset.update(**{counter: actual_count(source, field)})
+
+
+def count_drift(counter):
+    """Number of rows, where stored counter differs from actual value."""
+    model, source, field = COUNTERS[counter]
+    return model.objects.annotate(
+        actual=actual_count(source, field)
+    ).exclude(**{counter: F('actual')}).count()
@@ -0,0 +1,164 @@
+import logging
+from datetime import timedelta
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from foodgram.settings import (RECIPE_IMAGE_CLAIM_TIMEOUT,
+                               RECIPE_IMAGE_QUALITY, RECIPE_IMAGE_SIZES)
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'recipes/derivatives'
+FORMATS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpeg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+
+def flatten(image):
+    """RGB copy of image, with transparency put on white background."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, image_format):
+    """
+    Encoded image bytes.
+    Pillow writes no EXIF or ICC data unless asked, so metadata
+    of the upload is not carried over.
+    """
+    pillow_format, options = FORMATS[image_format]
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        pillow_format,
+        quality=RECIPE_IMAGE_QUALITY,
+        **options
+    )
+    return buffer.getvalue()
+
+
+def make_derivatives(recipe):
+    """Save resized copies of recipe image and return their paths."""
+    derivatives = {'source': recipe.image.name or ''}
+    if not recipe.image:
+        return derivatives
+
+    with recipe.image.open('rb') as file, Image.open(file) as original:
+        image = flatten(original)
+    stem = PurePosixPath(recipe.image.name).stem
+    for size, dimensions in RECIPE_IMAGE_SIZES.items():
+        resized = ImageOps.fit(image, dimensions, Image.LANCZOS)
+        derivatives[size] = {
+            image_format: default_storage.save(
+                f'{DERIVATIVES_DIR}/{recipe.pk}/{stem}_{size}.{image_format}',
+                ContentFile(encode(resized, image_format))
+            )
+            for image_format in FORMATS
+        }
+    return derivatives
+
+
+def delete_derivatives(derivatives):
+    for size in RECIPE_IMAGE_SIZES:
+        for path in derivatives.get(size, {}).values():
+            default_storage.delete(path)
+
+
+def derivative_url(recipe, size, image_format):
+    """
+    Storage url of resized copy or None,
+    if copies of the current image are not made yet.
+    """
+    if recipe.image_derivatives.get('source') != (recipe.image.name or ''):
+        return None
+    path = recipe.image_derivatives.get(size, {}).get(image_format)
+    return default_storage.url(path) if path else None
+
+
+def claim_recipe():
+    """
+    Claim the oldest recipe with unprocessed image and return it,
+    or None, when there is nothing to do.
+    Lock is held only for the claim, so several workers never take
+    the same recipe, while images are made outside of transaction.
+    Claim expires after RECIPE_IMAGE_CLAIM_TIMEOUT, so images
+    of a crashed worker are taken again.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=RECIPE_IMAGE_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            Q(image_claimed_at__isnull=True)
+            | Q(image_claimed_at__lt=expired),
+            image_processed=False
+        ).order_by('id').only(
+            'id', 'image', 'image_derivatives'
+        ).first()
+        if recipe is None:
+            return None
+        Recipe.objects.filter(pk=recipe.pk).update(image_claimed_at=now)
+    return recipe
+
+
+def store_derivatives(recipe_id, derivatives):
+    """
+    Save derivatives to recipe, if its image was not replaced
+    while they were made. Returns whether they were saved.
+    Recipe is marked processed only here, and its claim is released.
+    """
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id
+        ).first()
+        if recipe is None:
+            return False
+        if (recipe.image.name or '') != derivatives['source']:
+            # New image is not to wait for the claim to expire.
+            Recipe.objects.filter(pk=recipe_id).update(image_claimed_at=None)
+            return False
+        previous = recipe.image_derivatives
+        recipe.image_derivatives = derivatives
+        recipe.image_claimed_at = None
+        recipe.save(update_fields=(
+            'image_derivatives', 'image_processed', 'image_claimed_at'
+        ))
+    delete_derivatives(previous)
+    return True
+
+
+def process_next_recipe():
+    """
+    Make derivatives for one recipe with unprocessed image.
+    Returns processed recipe or None, when there is nothing to do.
+    """
+    recipe = claim_recipe()
+    if recipe is None:
+        return None
+
+    try:
+        derivatives = make_derivatives(recipe)
+    except (OSError, UnidentifiedImageError) as error:
+        logger.warning(
+            'Image of recipe %s is not processed: %s', recipe.pk, error
+        )
+        derivatives = {'source': recipe.image.name or ''}
+    if not store_derivatives(recipe.pk, derivatives):
+        # Image was replaced meanwhile and is queued again.
+        delete_derivatives(derivatives)
+    return recipe
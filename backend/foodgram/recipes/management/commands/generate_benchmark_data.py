@@ -0,0 +1,259 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes.cart_totals import rebuild
+from recipes.counters import COUNTERS, recount
+from recipes.management.commands.load_ingredients import DEFAULT_PATH
+from recipes.models import (Ingredient, IngredientAmount, Recipe,
+                            TableVersion, Tag)
+from recipes.search import update_search_vector
+from recipes.timelines import fan_out_recipe
+from users.models import User
+
+USERNAME_PREFIX = 'bench_user_'
+IMAGE_NAME = 'recipes/images/benchmark.png'
+TAGS = (
+    ('завтрак', '#FFFC66', 'breakfast'),
+    ('обед', '#54E709', 'lunch'),
+    ('ужин', '#8775D2', 'dinner'),
+)
+BATCH_SIZE = 1000
+
+
+def zipf_weights(size, exponent=1.1):
+    """Popularity weights, where a few items get most of the traffic."""
+    return [1 / (rank ** exponent) for rank in range(1, size + 1)]
+
+
+def weighted_sample(rand, population, weights, size):
+    """Up to size distinct items, picked according to weights."""
+    size = min(size, len(population))
+    picked = {}
+    while len(picked) < size:
+        for item in rand.choices(population, weights, k=size):
+            picked[item.pk] = item
+            if len(picked) == size:
+                break
+    return list(picked.values())
+
+
+class Command(BaseCommand):
+    help = ('Generate deterministic dataset of users, recipes, '
+            'favorites, carts and subscriptions for benchmarks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=8
+        )
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--catalogue',
+            default=str(DEFAULT_PATH),
+            help='Ingredient catalogue, loaded with load_ingredients.'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Remove previously generated users and their recipes.'
+        )
+
+    def handle(self, *args, **options):
+        rand = random.Random(options['seed'])
+
+        if options['clear']:
+            User.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            ).delete()
+
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(
+                'Benchmark data already exists, use --clear to regenerate.'
+            )
+
+        call_command('load_ingredients', options['catalogue'])
+        ingredients = list(Ingredient.objects.order_by('id'))
+        if not ingredients:
+            raise CommandError('Ingredient catalogue is empty.')
+
+        with transaction.atomic():
+            tags = self.create_tags()
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(
+                rand, users, tags, ingredients, options
+            )
+            self.create_relations(rand, users, recipes, options)
+
+            for counter in COUNTERS:
+                recount(counter)
+            # Relations were inserted in bulk, without timeline signals.
+            for recipe in recipes:
+                fan_out_recipe(recipe)
+            rebuild([user.pk for user in users])
+            update_search_vector([recipe.pk for recipe in recipes])
+            for model in (Recipe, User, Tag):
+                TableVersion.bump(model._meta.label)
+            for relation in (
+                Recipe.favorited.through,
+                Recipe.in_shopping_cart.through,
+                User.subscribes.through,
+            ):
+                TableVersion.bump(relation._meta.label)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(users)} users and {len(recipes)} recipes.'
+        ))
+
+    def create_tags(self):
+        return [
+            Tag.objects.get_or_create(
+                slug=slug,
+                defaults={'name': name, 'color': color}
+            )[0]
+            for name, color, slug in TAGS
+        ]
+
+    def create_users(self, count):
+        password = make_password(None)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{USERNAME_PREFIX}{number}',
+                    email=f'{USERNAME_PREFIX}{number}@example.com',
+                    first_name='Bench',
+                    last_name=f'User {number}',
+                    password=password
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE
+        )
+        return list(
+            User.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            ).order_by('id')
+        )
+
+    def create_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new('RGB', (64, 64), '#FFAA00').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def create_recipes(self, rand, users, tags, ingredients, options):
+        image = self.create_image()
+        author_weights = zipf_weights(len(users))
+        now = timezone.now()
+        recipes = [
+            Recipe(
+                author=rand.choices(users, author_weights)[0],
+                name=f'Benchmark recipe {number}',
+                text=' '.join(
+                    rand.choice(ingredients).name for _ in range(12)
+                ),
+                cooking_time=rand.randint(5, 180),
+                image=image
+            )
+            for number in range(options['recipes'])
+        ]
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        recipes = list(
+            Recipe.objects.filter(
+                author__username__startswith=USERNAME_PREFIX
+            ).order_by('id')
+        )
+        for number, recipe in enumerate(recipes):
+            recipe.pub_date = now - timedelta(
+                minutes=len(recipes) - number
+            )
+        Recipe.objects.bulk_update(
+            recipes,
+            ('pub_date', ),
+            batch_size=BATCH_SIZE
+        )
+
+        ingredient_weights = zipf_weights(len(ingredients), exponent=0.8)
+        IngredientAmount.objects.bulk_create(
+            (
+                IngredientAmount(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=rand.randint(1, 500)
+                )
+                for recipe in recipes
+                for ingredient in weighted_sample(
+                    rand,
+                    ingredients,
+                    ingredient_weights,
+                    options['ingredients_per_recipe']
+                )
+            ),
+            batch_size=BATCH_SIZE
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for recipe in recipes
+                for tag in rand.sample(tags, rand.randint(1, len(tags)))
+            ),
+            batch_size=BATCH_SIZE
+        )
+        return recipes
+
+    def create_relations(self, rand, users, recipes, options):
+        recipe_weights = zipf_weights(len(recipes))
+        popular_recipes = rand.sample(recipes, len(recipes))
+        author_weights = zipf_weights(len(users))
+        relations = (
+            (Recipe.favorited.through, options['favorites_per_user']),
+            (Recipe.in_shopping_cart.through, options['cart_per_user']),
+        )
+        for through, per_user in relations:
+            through.objects.bulk_create(
+                (
+                    through(recipe_id=recipe.pk, user_id=user.pk)
+                    for user in users
+                    for recipe in weighted_sample(
+                        rand,
+                        popular_recipes,
+                        recipe_weights,
+                        rand.randint(0, per_user * 2)
+                    )
+                ),
+                batch_size=BATCH_SIZE
+            )
+
+        User.subscribes.through.objects.bulk_create(
+            (
+                User.subscribes.through(
+                    from_user_id=user.pk,
+                    to_user_id=author.pk
+                )
+                for user in users
+                for author in weighted_sample(
+                    rand,
+                    users,
+                    author_weights,
+                    rand.randint(0, options['subscriptions_per_user'] * 2)
+                )
+                if author.pk != user.pk
+            ),
+            batch_size=BATCH_SIZE
+        )
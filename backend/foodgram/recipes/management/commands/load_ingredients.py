@@ -0,0 +1,147 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram.settings import BASE_DIR
+from recipes.models import CatalogueImport, Ingredient, TableVersion
+
+DEFAULT_PATH = BASE_DIR.parent.parent / 'data' / 'ingredients.csv'
+CHUNK_SIZE = 64 * 1024
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as source:
+        for row in csv.reader(source):
+            if len(row) == 2:
+                yield row[0].strip(), row[1].strip()
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as source:
+        for item in json.load(source):
+            yield item['name'].strip(), item['measurement_unit'].strip()
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Load ingredient catalogue from csv or json file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(DEFAULT_PATH),
+            help='Path to ingredients.csv or ingredients.json.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT statement.'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Import even if file checksum matches the last import.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'File {path} does not exist.')
+
+        extension = os.path.splitext(path)[1].lower()
+        readers = {'.csv': read_csv, '.json': read_json}
+        if extension not in readers:
+            raise CommandError('Only .csv and .json files are supported.')
+
+        source = os.path.basename(path)
+        checksum = file_checksum(path)
+        if not options['force'] and CatalogueImport.objects.filter(
+            source=source,
+            checksum=checksum
+        ).exists():
+            self.stdout.write(f'{source} is unchanged, nothing to load.')
+            return
+
+        started = time.perf_counter()
+        rows = readers[extension](path)
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                total = self.copy_rows(rows)
+            else:
+                total = self.insert_rows(rows, options['batch_size'])
+            TableVersion.bump(Ingredient._meta.label)
+            CatalogueImport.objects.update_or_create(
+                source=source,
+                defaults={'checksum': checksum}
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {total} rows from {source} in {elapsed:.3f}s '
+            f'({total / elapsed if elapsed else total:.0f} rows/s).'
+        ))
+
+    def insert_rows(self, rows, batch_size):
+        total = 0
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in batch
+                ),
+                ignore_conflicts=True
+            )
+            total += len(batch)
+        return total
+
+    def copy_rows(self, rows):
+        """Stream rows with COPY into temp table and merge them. """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        total = 0
+        for row in rows:
+            writer.writerow(row)
+            total += 1
+        buffer.seek(0)
+
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_import '
+                '(name varchar(200), measurement_unit varchar(30)) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+        return total
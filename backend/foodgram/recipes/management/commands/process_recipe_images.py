@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_next_recipe
+
+
+class Command(BaseCommand):
+    help = 'Make resized WebP and JPEG copies of uploaded recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process pending images and exit.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when there are no new images.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            if process_next_recipe() is not None:
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
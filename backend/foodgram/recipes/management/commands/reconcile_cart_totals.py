@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cart_totals import find_drift, rebuild
+
+
+class Command(BaseCommand):
+    help = ('Compare stored shopping cart totals with totals '
+            'aggregated from scratch and rebuild drifted carts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted totals, do not fix them.'
+        )
+
+    def handle(self, *args, **options):
+        drift = find_drift()
+        for (user_id, ingredient_id), (stored, actual) in sorted(
+            drift.items()
+        ):
+            self.stdout.write(
+                f'user {user_id}, ingredient {ingredient_id}: '
+                f'stored {stored}, actual {actual}.'
+            )
+        user_ids = {user_id for user_id, _ in drift}
+        self.stdout.write(
+            f'{len(drift)} drifted total(s) in {len(user_ids)} cart(s).'
+        )
+        if user_ids and not options['check']:
+            rebuild(user_ids)
+            self.stdout.write(self.style.SUCCESS('Cart totals reconciled.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, count_drift, recount
+
+
+class Command(BaseCommand):
+    help = 'Recount stored favorites, cart, recipes and followers counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted rows, do not fix them.'
+        )
+
+    def handle(self, *args, **options):
+        for counter in COUNTERS:
+            drift = count_drift(counter)
+            self.stdout.write(f'{counter}: {drift} drifted row(s).')
+            if drift and not options['check']:
+                with transaction.atomic():
+                    recount(counter)
+        if not options['check']:
+            self.stdout.write(self.style.SUCCESS('Counters reconciled.'))
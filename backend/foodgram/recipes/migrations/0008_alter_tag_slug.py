@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_alter_ingredientamount_ingredient_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(help_text='Slug', unique=True, verbose_name='Tag slug'),
+        ),
+    ]
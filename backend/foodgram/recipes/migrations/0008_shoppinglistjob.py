@@ -0,0 +1,35 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_alter_tag_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('rendering', 'Rendering'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', help_text='Job status', max_length=16, verbose_name='Job status')),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Progress in percents', verbose_name='Job progress')),
+                ('result', models.BinaryField(default=None, null=True, verbose_name='Rendered file')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creation date')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Update date')),
+                ('user', models.ForeignKey(help_text='Job owner', on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Shopping list job',
+                'verbose_name_plural': 'Shopping list jobs',
+                'ordering': ('created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:48
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+# Upper bound of PositiveSmallIntegerField on every supported database.
+MAX_MERGED_AMOUNT = 32767
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Keep the oldest of ingredients with the same name and unit,
+    so the unique constraint can be added.
+    Amounts of removed duplicates are moved to the kept ingredient,
+    or added to its amount, when a recipe uses both.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    groups = Ingredient.objects.values('name', 'measurement_unit').annotate(
+        kept_id=Min('id'),
+        total=Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in groups:
+        duplicate_ids = list(
+            Ingredient.objects.filter(
+                name=group['name'],
+                measurement_unit=group['measurement_unit']
+            ).exclude(pk=group['kept_id']).values_list('pk', flat=True)
+        )
+        kept = {
+            amount.recipe_id: amount
+            for amount in IngredientAmount.objects.filter(
+                ingredient_id=group['kept_id']
+            )
+        }
+        for amount in IngredientAmount.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ).order_by('pk'):
+            existing = kept.get(amount.recipe_id)
+            if existing is None:
+                amount.ingredient_id = group['kept_id']
+                amount.save(update_fields=('ingredient', ))
+                kept[amount.recipe_id] = amount
+            else:
+                existing.amount = min(
+                    existing.amount + amount.amount, MAX_MERGED_AMOUNT
+                )
+                existing.save(update_fields=('amount', ))
+                amount.delete()
+        Ingredient.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shoppinglistjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Imported file name', max_length=255, unique=True, verbose_name='Source')),
+                ('checksum', models.CharField(help_text='sha256 of imported file', max_length=64, verbose_name='Checksum')),
+                ('imported_at', models.DateTimeField(auto_now=True, verbose_name='Import date')),
+            ],
+            options={
+                'verbose_name': 'Catalogue import',
+                'verbose_name_plural': 'Catalogue imports',
+            },
+        ),
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
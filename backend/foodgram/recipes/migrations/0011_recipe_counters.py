@@ -0,0 +1,50 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(source, field):
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    Recipe.objects.update(
+        favorites_count=count(Recipe.favorited.through, 'recipe_id'),
+        in_cart_count=count(Recipe.in_shopping_cart.through, 'recipe_id'),
+    )
+    User.objects.update(
+        recipes_count=count(Recipe, 'author_id'),
+        followers_count=count(User.subscribes.through, 'to_user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_tableversion'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, help_text='Number of users favorited recipe', verbose_name='Favorites count'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_cart_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, help_text='Number of users added recipe to cart', verbose_name='Shopping cart count'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
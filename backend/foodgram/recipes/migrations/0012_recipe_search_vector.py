@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:54
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+INDEX_NAME = 'recipe_search_vector_gin'
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index and initial vectors exist only on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INDEX_NAME} ON recipes_recipe '
+        'USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'UPDATE recipes_recipe SET search_vector = '
+        "setweight(to_tsvector(%s::regconfig, name), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, text), 'B')",
+        (settings.SEARCH_CONFIG, settings.SEARCH_CONFIG)
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
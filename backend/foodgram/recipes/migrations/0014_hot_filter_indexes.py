@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+from recipes.operations import (AddIndexConcurrentlyIfSupported,
+                                AddTableIndexConcurrently)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0013_timelines'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='ingredientamount',
+            index=models.Index(fields=['ingredient', 'recipe'], include=('amount',), name='ingredientamount_cart_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        AddTableIndexConcurrently(
+            table='recipes_recipe_tags',
+            name='recipe_tags_tag_recipe_idx',
+            columns=['tag_id', 'recipe_id'],
+        ),
+        AddTableIndexConcurrently(
+            table='recipes_recipe_favorited',
+            name='recipe_favorited_user_idx',
+            columns=['user_id', 'recipe_id'],
+        ),
+        AddTableIndexConcurrently(
+            table='recipes_recipe_in_shopping_cart',
+            name='recipe_cart_user_idx',
+            columns=['user_id', 'recipe_id'],
+        ),
+    ]
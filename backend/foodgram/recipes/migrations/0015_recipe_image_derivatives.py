@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Paths of resized image copies by size and format', verbose_name='Image derivatives'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_processed',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='Image derivatives match current image', verbose_name='Image processed'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:04
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(default=None, null=True, storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/images'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_totals(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    CartIngredientTotal = apps.get_model('recipes', 'CartIngredientTotal')
+    rows = Recipe.in_shopping_cart.through.objects.filter(
+        recipe__recipe_ingredients__isnull=False
+    ).values(
+        'user_id', 'recipe__recipe_ingredients__ingredient_id'
+    ).annotate(total=Sum('recipe__recipe_ingredients__amount')).order_by()
+    CartIngredientTotal.objects.bulk_create(
+        (
+            CartIngredientTotal(
+                user_id=row['user_id'],
+                ingredient_id=row['recipe__recipe_ingredients__ingredient_id'],
+                total_amount=row['total']
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0016_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartIngredientTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(help_text='Sum of ingredient amounts in carted recipes', verbose_name='Total amount')),
+                ('ingredient', models.ForeignKey(help_text='Ingredient', on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to='recipes.ingredient')),
+                ('user', models.ForeignKey(help_text='Cart owner', on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cart ingredient total',
+                'verbose_name_plural': 'Cart ingredient totals',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartingredienttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_ingredient_total'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_cart_ingredient_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped on every change of cached representation', verbose_name='Version'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.1 on 2026-10-18 19:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from recipes.operations import AddIndexConcurrentlyIfSupported
+
+
+def fill_pub_dates(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    TimelineEntry.objects.update(
+        pub_date=Subquery(
+            Recipe.objects.filter(
+                pk=OuterRef('recipe_id')
+            ).values('pub_date')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0018_recipe_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(help_text='Copy of recipe publication date, to order timeline', null=True, verbose_name='Publication date'),
+        ),
+        migrations.RunPython(
+            fill_pub_dates,
+            migrations.RunPython.noop,
+            atomic=True
+        ),
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(help_text='Copy of recipe publication date, to order timeline', verbose_name='Publication date'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='timeline_user_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+from recipes.operations import RemoveIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0019_timelineentry_pub_date'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrentlyIfSupported(
+            model_name='ingredientamount',
+            name='ingredientamount_cart_idx',
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, help_text='Recipe publication date', verbose_name='Publication date'),
+        ),
+    ]
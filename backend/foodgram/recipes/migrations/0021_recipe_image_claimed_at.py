@@ -0,0 +1,36 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+def requeue_unfinished_images(apps, schema_editor):
+    # Claims used to mark recipes processed before copies were made,
+    # so images of crashed workers are queued again.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    unfinished = [
+        recipe.pk
+        for recipe in Recipe.objects.filter(image_processed=True).only(
+            'id', 'image', 'image_derivatives'
+        ).iterator()
+        if recipe.image_derivatives.get('source') != (recipe.image.name or '')
+    ]
+    Recipe.objects.filter(pk__in=unfinished).update(image_processed=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_drop_redundant_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When image worker took the image, to retry it if the worker does not finish in time', null=True, verbose_name='Image claimed at'),
+        ),
+        migrations.RunPython(
+            requeue_unfinished_images,
+            migrations.RunPython.noop
+        ),
+    ]
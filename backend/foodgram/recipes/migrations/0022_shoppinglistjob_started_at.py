@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0021_recipe_image_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When worker took the job, to take it again if the worker does not finish in time', null=True, verbose_name='Start date'),
+        ),
+    ]
@@ -1,11 +1,22 @@
+import uuid
+from collections import Counter
+
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 
 from foodgram.settings import (MAX_AMOUNT, MAX_COOKING_TIME, MIN_AMOUNT,
                                MIN_COOKING_TIME)
+from recipes.storage import content_addressed_storage
 from users.models import User
 
+# Sent once per recipe, whose ingredient amounts were changed,
+# with recipe_id and amount_deltas (ingredient id to delta).
+# Bulk writes of IngredientAmount rows should send it themselves.
+ingredient_amounts_changed = Signal()
+
 
 class Ingredient(models.Model):
     """Model for ingredients."""
@@ -25,6 +36,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_name_unit'
+            ),
+        )
 
     def __str__(self) -> str:
         return f'{self.name}, {self.measurement_unit}'
@@ -74,6 +91,53 @@ class Tag(models.Model):
         return self.name
 
 
+def relation_prefetches():
+    """Prefetches of recipe tags and ingredient amounts."""
+    return (
+        models.Prefetch('tags', queryset=Tag.objects.all()),
+        models.Prefetch(
+            'recipe_ingredients',
+            queryset=IngredientAmount.objects.select_related('ingredient')
+        ),
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queryset with helpers used by the recipes API. """
+
+    def with_relations(self):
+        """Load author, tags and ingredient amounts in a fixed query count."""
+        return self.select_related('author').prefetch_related(
+            *relation_prefetches()
+        )
+
+    def bump_version(self):
+        """Mark cached representations of recipes as outdated."""
+        return self.update(version=models.F('version') + 1)
+
+    def with_user_flags(self, user):
+        """Annotate is_favorited and is_in_shopping_cart for the given user."""
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Recipe.favorited.through.objects.filter(
+                    recipe_id=models.OuterRef('pk'),
+                    user_id=user.id
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                Recipe.in_shopping_cart.through.objects.filter(
+                    recipe_id=models.OuterRef('pk'),
+                    user_id=user.id
+                )
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Model for recipes"""
     author = models.ForeignKey(
@@ -85,7 +149,6 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Publication date',
         auto_now_add=True,
-        db_index=True,
         help_text='Recipe publication date'
     )
     ingredients = models.ManyToManyField(
@@ -119,9 +182,32 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/images',
+        storage=content_addressed_storage,
         null=True,
         default=None
     )
+    image_derivatives = models.JSONField(
+        'Image derivatives',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Paths of resized image copies by size and format'
+    )
+    image_processed = models.BooleanField(
+        'Image processed',
+        default=False,
+        db_index=True,
+        editable=False,
+        help_text='Image derivatives match current image'
+    )
+    image_claimed_at = models.DateTimeField(
+        'Image claimed at',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='When image worker took the image, to retry it '
+                  'if the worker does not finish in time'
+    )
     text = models.TextField(
         'Recipe description'
     )
@@ -141,11 +227,50 @@ class Recipe(models.Model):
         ),
         help_text='Time of cooking'
     )
+    favorites_count = models.PositiveIntegerField(
+        'Favorites count',
+        default=0,
+        db_index=True,
+        help_text='Number of users favorited recipe'
+    )
+    in_cart_count = models.PositiveIntegerField(
+        'Shopping cart count',
+        default=0,
+        db_index=True,
+        help_text='Number of users added recipe to cart'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        'Version',
+        default=0,
+        editable=False,
+        help_text='Bumped on every change of cached representation'
+    )
+    fanned_out = models.BooleanField(
+        'Pushed to timelines',
+        default=False,
+        help_text='Recipe was pushed to followers timelines on creation'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('name', 'author'),
@@ -196,3 +321,249 @@ class IngredientAmount(models.Model):
 
     def __str__(self) -> str:
         return f'{self.ingredient.name}: {self.amount}'
+
+    @staticmethod
+    def send_changes(changes):
+        """Send changes, keyed by (recipe id, ingredient id), per recipe."""
+        by_recipe = {}
+        for (recipe_id, ingredient_id), delta in changes.items():
+            if delta:
+                by_recipe.setdefault(recipe_id, {})[ingredient_id] = delta
+        for recipe_id, amount_deltas in by_recipe.items():
+            ingredient_amounts_changed.send(
+                sender=IngredientAmount,
+                recipe_id=recipe_id,
+                amount_deltas=amount_deltas
+            )
+
+    def stored_changes(self):
+        """Changes removing amount of the row, as it is stored now."""
+        changes = Counter()
+        stored = IngredientAmount.objects.filter(pk=self.pk).values_list(
+            'recipe_id', 'ingredient_id', 'amount'
+        ).first() if self.pk is not None else None
+        if stored:
+            changes[stored[:2]] -= stored[2]
+        return changes
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            changes = self.stored_changes()
+            super().save(*args, **kwargs)
+            changes[(self.recipe_id, self.ingredient_id)] += self.amount
+            self.send_changes(changes)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            changes = self.stored_changes()
+            result = super().delete(*args, **kwargs)
+            self.send_changes(changes)
+        return result
+
+
+class CartIngredientTotal(models.Model):
+    """Total amount of ingredient over recipes in user shopping cart. """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        help_text='Cart owner'
+    )
+    ingredient = models.ForeignKey(
+        'Ingredient',
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        help_text='Ingredient'
+    )
+    total_amount = models.PositiveIntegerField(
+        'Total amount',
+        help_text='Sum of ingredient amounts in carted recipes'
+    )
+
+    class Meta:
+        verbose_name = 'Cart ingredient total'
+        verbose_name_plural = 'Cart ingredient totals'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_cart_ingredient_total'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.ingredient_id} {self.total_amount}'
+
+
+class ShoppingListJob(models.Model):
+    """Queued rendering of user shopping list. """
+    PENDING = 'pending'
+    RENDERING = 'rendering'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RENDERING, 'Rendering'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_jobs',
+        help_text='Job owner'
+    )
+    status = models.CharField(
+        'Job status',
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True,
+        help_text='Job status'
+    )
+    progress = models.PositiveSmallIntegerField(
+        'Job progress',
+        default=0,
+        help_text='Progress in percents'
+    )
+    result = models.BinaryField(
+        'Rendered file',
+        null=True,
+        default=None
+    )
+    error = models.TextField(
+        'Error',
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        'Creation date',
+        auto_now_add=True,
+        db_index=True
+    )
+    updated_at = models.DateTimeField(
+        'Update date',
+        auto_now=True
+    )
+    started_at = models.DateTimeField(
+        'Start date',
+        null=True,
+        blank=True,
+        help_text='When worker took the job, to take it again '
+                  'if the worker does not finish in time'
+    )
+
+    class Meta:
+        verbose_name = 'Shopping list job'
+        verbose_name_plural = 'Shopping list jobs'
+        ordering = ('created_at',)
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.status}'
+
+
+class CatalogueImport(models.Model):
+    """Checksum of the last imported catalogue file. """
+    source = models.CharField(
+        'Source',
+        max_length=255,
+        unique=True,
+        help_text='Imported file name'
+    )
+    checksum = models.CharField(
+        'Checksum',
+        max_length=64,
+        help_text='sha256 of imported file'
+    )
+    imported_at = models.DateTimeField(
+        'Import date',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Catalogue import'
+        verbose_name_plural = 'Catalogue imports'
+
+    def __str__(self) -> str:
+        return f'{self.source}: {self.checksum}'
+
+
+class TableVersion(models.Model):
+    """Change counter of a table, bumped on every write. """
+    table = models.CharField(
+        'Table',
+        max_length=100,
+        unique=True,
+        help_text='Model label'
+    )
+    version = models.PositiveBigIntegerField(
+        'Version',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Table version'
+        verbose_name_plural = 'Table versions'
+
+    def __str__(self) -> str:
+        return f'{self.table}: {self.version}'
+
+    @classmethod
+    def bump(cls, table):
+        updated = cls.objects.filter(table=table).update(
+            version=models.F('version') + 1
+        )
+        if not updated:
+            cls.objects.get_or_create(table=table, defaults={'version': 1})
+
+    @classmethod
+    def get_versions(cls, tables):
+        versions = dict(
+            cls.objects.filter(table__in=tables).values_list(
+                'table', 'version'
+            )
+        )
+        return tuple(versions.get(table, 0) for table in tables)
+
+
+class TimelineEntry(models.Model):
+    """Recipe pushed to timeline of author follower. """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        help_text='Follower'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        help_text='Recipe'
+    )
+    pub_date = models.DateTimeField(
+        'Publication date',
+        help_text='Copy of recipe publication date, to order timeline'
+    )
+
+    class Meta:
+        verbose_name = 'Timeline entry'
+        verbose_name_plural = 'Timeline entries'
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_user_recipe'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.recipe_id}'
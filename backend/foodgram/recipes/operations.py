@@ -0,0 +1,110 @@
+from django.contrib.postgres.operations import (AddIndexConcurrently,
+                                                RemoveIndexConcurrently)
+from django.db.migrations.operations import AddIndex, RemoveIndex
+from django.db.migrations.operations.base import Operation
+
+
+def is_postgresql(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AddIndexConcurrentlyIfSupported(AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL,
+    plain AddIndex on other databases.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return AddIndex.database_forwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if is_postgresql(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return AddIndex.database_backwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+
+class RemoveIndexConcurrentlyIfSupported(RemoveIndexConcurrently):
+    """
+    DROP INDEX CONCURRENTLY on PostgreSQL,
+    plain RemoveIndex on other databases.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return RemoveIndex.database_forwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if is_postgresql(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return RemoveIndex.database_backwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+
+class AddTableIndexConcurrently(Operation):
+    """
+    Index on a table without model of its own,
+    such as auto-created many-to-many tables.
+    Created concurrently on PostgreSQL.
+    """
+    reduces_to_sql = False
+    reversible = True
+    atomic = False
+
+    def __init__(self, table, name, columns):
+        self.table = table
+        self.name = name
+        self.columns = columns
+
+    def deconstruct(self):
+        return (
+            self.__class__.__name__,
+            [],
+            {'table': self.table, 'name': self.name, 'columns': self.columns}
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        concurrently = 'CONCURRENTLY ' if is_postgresql(schema_editor) else ''
+        quote = schema_editor.quote_name
+        columns = ', '.join(quote(column) for column in self.columns)
+        schema_editor.execute(
+            f'CREATE INDEX {concurrently}IF NOT EXISTS {quote(self.name)} '
+            f'ON {quote(self.table)} ({columns})'
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        concurrently = 'CONCURRENTLY ' if is_postgresql(schema_editor) else ''
+        schema_editor.execute(
+            f'DROP INDEX {concurrently}IF EXISTS '
+            f'{schema_editor.quote_name(self.name)}'
+        )
+
+    def describe(self):
+        return (f'Create index {self.name} on {self.table} '
+                f'({", ".join(self.columns)})')
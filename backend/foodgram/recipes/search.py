@@ -0,0 +1,128 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+
+from foodgram.settings import SEARCH_CONFIG
+from recipes.models import Recipe, TableVersion
+
+NAME_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+TOKEN_PATTERN = re.compile(r'\w+')
+SEARCH_FIELDS = frozenset(('name', 'text'))
+# Version of searchable recipe content, bumped only when it changes,
+# unlike recipe table version, bumped by counter and image writes too.
+SEARCH_TABLE = 'recipes.Recipe.search'
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def recipe_search_vector():
+    """Weighted tsvector of recipe name and description."""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(recipe_ids):
+    """Reindex recipes, whose name or text has changed."""
+    if is_postgresql():
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=recipe_search_vector()
+        )
+    TableVersion.bump(SEARCH_TABLE)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.casefold().replace('ё', 'е'))
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over recipe name and text,
+    used where PostgreSQL full-text search is not available.
+    Rebuilt when searchable content of recipes changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._postings = {}
+        self._documents = 0
+
+    def invalidate(self):
+        self._version = None
+
+    def _build(self, version):
+        with self._lock:
+            if self._version == version:
+                return
+            postings = defaultdict(dict)
+            documents = 0
+            for pk, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text'
+            ).iterator():
+                documents += 1
+                weights = Counter()
+                for token in tokenize(name):
+                    weights[token] += NAME_WEIGHT
+                for token in tokenize(text):
+                    weights[token] += TEXT_WEIGHT
+                for token, weight in weights.items():
+                    postings[token][pk] = weight
+            self._postings = dict(postings)
+            self._documents = documents
+            self._version = version
+
+    def search(self, query):
+        """Map recipe id to rank for recipes containing every query term."""
+        version, = TableVersion.get_versions((SEARCH_TABLE, ))
+        if self._version != version:
+            self._build(version)
+
+        terms = set(tokenize(query))
+        if not terms:
+            return {}
+        postings = [self._postings.get(term, {}) for term in terms]
+        postings.sort(key=len)
+        ranks = {}
+        for pk in postings[0]:
+            if all(pk in posting for posting in postings[1:]):
+                ranks[pk] = sum(
+                    posting[pk] * math.log(1 + self._documents / len(posting))
+                    for posting in postings
+                )
+        return ranks
+
+
+inverted_index = InvertedIndex()
+
+
+def search_recipes(queryset, query):
+    """Filter queryset by full-text query and order it by rank."""
+    if is_postgresql():
+        search_query = SearchQuery(
+            query,
+            config=SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-pub_date', '-id')
+
+    ranks = inverted_index.search(query)
+    return queryset.filter(pk__in=ranks).annotate(
+        rank=Case(
+            *(When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    ).order_by('-rank', '-pub_date', '-id')
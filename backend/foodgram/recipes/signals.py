@@ -0,0 +1,322 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from recipes.cart_totals import (apply_deltas, cart_deltas,
+                                 change_recipe_amounts)
+from recipes.counters import recount
+from recipes.images import delete_derivatives
+from recipes.models import (CartIngredientTotal, Ingredient, IngredientAmount,
+                            Recipe, TableVersion, Tag,
+                            ingredient_amounts_changed)
+from recipes.search import (SEARCH_FIELDS, SEARCH_TABLE,
+                            update_search_vector)
+from recipes.timelines import add_authors, fan_out_recipe, remove_authors
+from recipes.versions import bump_versions
+from users.models import User
+
+RELATION_COUNTERS = (
+    (Recipe.favorited.through, 'favorites_count', 'favorited_recipes'),
+    (Recipe.in_shopping_cart.through, 'in_cart_count', 'shopping_cart'),
+)
+
+
+def update_relation_counter(counter, reverse_name):
+    """
+    m2m_changed receiver, what keeps recipe counter up to date
+    inside the transaction of relation change.
+    """
+
+    def receiver(sender, instance, action, reverse, pk_set, **kwargs):
+        if action == 'pre_clear' and reverse:
+            instance._cleared_recipe_ids = list(
+                getattr(instance, reverse_name).values_list('pk', flat=True)
+            )
+            return
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+
+        if not reverse:
+            recipe_ids = (instance.pk, )
+        elif action == 'post_clear':
+            recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', ())
+        else:
+            recipe_ids = pk_set
+
+        if action == 'post_add' and not reverse:
+            Recipe.objects.filter(pk=instance.pk).update(
+                **{counter: F(counter) + len(pk_set)}
+            )
+        elif action == 'post_add':
+            Recipe.objects.filter(pk__in=pk_set).update(
+                **{counter: F(counter) + 1}
+            )
+        elif recipe_ids:
+            recount(counter, recipe_ids)
+
+    return receiver
+
+
+for relation, counter, reverse_name in RELATION_COUNTERS:
+    m2m_changed.connect(
+        update_relation_counter(counter, reverse_name),
+        sender=relation,
+        weak=False
+    )
+
+
+@receiver(m2m_changed, sender=User.subscribes.through)
+def update_followers_count(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_author_ids = list(
+            instance.subscribes.values_list('pk', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        author_ids = (instance.pk, )
+    elif action == 'post_clear':
+        author_ids = instance.__dict__.pop('_cleared_author_ids', ())
+    else:
+        author_ids = pk_set
+
+    if action == 'post_add' and not reverse:
+        User.objects.filter(pk__in=pk_set).update(
+            followers_count=F('followers_count') + 1
+        )
+    elif author_ids:
+        recount('followers_count', author_ids)
+
+
+USER_RELATION_COUNTERS = (
+    ('favorites_count', 'favorited_recipes'),
+    ('in_cart_count', 'shopping_cart'),
+    ('followers_count', 'subscribes'),
+)
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_relations(sender, instance, **kwargs):
+    # Relations of deleted user are removed by cascade, without m2m_changed.
+    instance._counter_pks = {
+        counter: list(
+            getattr(instance, accessor).values_list('pk', flat=True)
+        )
+        for counter, accessor in USER_RELATION_COUNTERS
+    }
+
+
+@receiver(post_delete, sender=User)
+def recount_user_relations(sender, instance, **kwargs):
+    for counter, pks in instance.__dict__.pop('_counter_pks', {}).items():
+        if pks:
+            recount(counter, pks)
+
+
+@receiver(pre_save, sender=Recipe)
+def check_search_content(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    """Remember, whether name or text of saved recipe is changing."""
+    if raw or (update_fields and not SEARCH_FIELDS & set(update_fields)):
+        instance._search_changed = False
+    elif instance._state.adding:
+        instance._search_changed = True
+    else:
+        instance._search_changed = Recipe.objects.filter(
+            pk=instance.pk
+        ).values_list('name', 'text').first() != (instance.name, instance.text)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_search_vector(sender, instance, **kwargs):
+    if instance.__dict__.pop('_search_changed', True):
+        update_search_vector((instance.pk, ))
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_from_search(sender, instance, **kwargs):
+    TableVersion.bump(SEARCH_TABLE)
+
+
+@receiver(m2m_changed, sender=User.subscribes.through)
+def update_timelines(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._timeline_follower_ids = list(
+            instance.user_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_add' and not reverse:
+        add_authors(instance.pk, pk_set)
+    elif action == 'post_add':
+        for follower_id in pk_set:
+            add_authors(follower_id, (instance.pk, ))
+    elif action == 'post_remove' and not reverse:
+        remove_authors(instance.pk, pk_set)
+    elif action == 'post_remove':
+        for follower_id in pk_set:
+            remove_authors(follower_id, (instance.pk, ))
+    elif action == 'post_clear' and not reverse:
+        remove_authors(instance.pk)
+    elif action == 'post_clear':
+        for follower_id in instance.__dict__.pop(
+            '_timeline_follower_ids', ()
+        ):
+            remove_authors(follower_id, (instance.pk, ))
+
+
+@receiver(post_save, sender=Recipe)
+def push_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(sender, instance, **kwargs):
+    User.objects.filter(
+        pk=instance.author_id,
+        recipes_count__gt=0
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+@receiver(pre_save, sender=Recipe)
+def check_image_derivatives(sender, instance, **kwargs):
+    """Queue recipe for image processing, when its image was replaced."""
+    image = instance.image
+    name = image.name or ''
+    if image and not image._committed:
+        # New upload gets its storage name only when the field saves it.
+        name = image.field.generate_filename(instance, name)
+    instance.image_processed = (
+        name == instance.image_derivatives.get('source')
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_image_derivatives(sender, instance, **kwargs):
+    derivatives = instance.image_derivatives
+    transaction.on_commit(lambda: delete_derivatives(derivatives))
+
+
+@receiver(m2m_changed, sender=Recipe.in_shopping_cart.through)
+def update_cart_totals(sender, instance, action, reverse, pk_set, **kwargs):
+    """Apply ingredient amounts of added or removed recipes to cart totals."""
+    if action == 'pre_remove':
+        # pk_set holds requested ids, only present ones are removed.
+        if reverse:
+            rows = sender.objects.filter(
+                user_id=instance.pk, recipe_id__in=pk_set
+            ).values_list('recipe_id', flat=True)
+        else:
+            rows = sender.objects.filter(
+                recipe_id=instance.pk, user_id__in=pk_set
+            ).values_list('user_id', flat=True)
+        instance._cart_removed_ids = set(rows)
+    elif action == 'pre_clear' and not reverse:
+        instance._cart_removed_ids = set(
+            instance.in_shopping_cart.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear' and reverse:
+        CartIngredientTotal.objects.filter(user=instance).delete()
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if action == 'post_add':
+            pks, sign = pk_set, 1
+        else:
+            pks = instance.__dict__.pop('_cart_removed_ids', ())
+            sign = -1
+        if reverse:
+            apply_deltas(cart_deltas((instance.pk, ), pks, sign))
+        else:
+            apply_deltas(cart_deltas(pks, (instance.pk, ), sign))
+
+
+@receiver(ingredient_amounts_changed, sender=IngredientAmount)
+def update_recipe_cart_totals(sender, recipe_id, amount_deltas, **kwargs):
+    change_recipe_amounts(recipe_id, amount_deltas)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_cart_totals(sender, instance, **kwargs):
+    # Cart rows of deleted recipe are removed by cascade, without signals.
+    user_ids = Recipe.in_shopping_cart.through.objects.filter(
+        recipe_id=instance.pk
+    ).values_list('user_id', flat=True)
+    apply_deltas(cart_deltas(user_ids, (instance.pk, ), -1))
+
+
+@receiver(post_save, sender=Recipe)
+def bump_saved_recipe_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_versions((instance.pk, ))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_tagged_recipe_version(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._version_recipe_ids = list(
+            instance.tagged_recipes.values_list('pk', flat=True)
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            recipe_ids = (instance.pk, )
+        elif action == 'post_clear':
+            recipe_ids = instance.__dict__.pop('_version_recipe_ids', ())
+        else:
+            recipe_ids = pk_set
+        bump_versions(recipe_ids)
+
+
+@receiver(ingredient_amounts_changed, sender=IngredientAmount)
+def bump_changed_amounts_recipe_version(sender, recipe_id, **kwargs):
+    bump_versions((recipe_id, ))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(sender, instance, **kwargs):
+    # Ingredient amounts are removed by cascade, without signals.
+    instance._version_recipe_ids = list(
+        instance.used_in_recipes.values_list('recipe_id', flat=True)
+    )
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredient_recipes_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recipe_ids = instance.__dict__.pop('_version_recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = instance.used_in_recipes.values_list(
+            'recipe_id', flat=True
+        )
+    bump_versions(recipe_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_recipes(sender, instance, **kwargs):
+    # Tag relations are removed by cascade, without m2m_changed.
+    instance._version_recipe_ids = list(
+        instance.tagged_recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tag_recipes_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recipe_ids = instance.__dict__.pop('_version_recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = instance.tagged_recipes.values_list('pk', flat=True)
+    bump_versions(recipe_ids)
@@ -0,0 +1,37 @@
+import hashlib
+from pathlib import PurePosixPath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_digest(content):
+    """sha256 of file content, leaving the file at its start."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Storage for files named by hash of their content.
+    A file, that already exists under the hash of saved content,
+    has the same content, so it is reused instead of being written again.
+    Files with any other names are saved as usual.
+    """
+
+    def save(self, name, content, max_length=None):
+        if (
+            name is not None
+            and PurePosixPath(name).stem == content_digest(content)
+            and self.exists(name)
+        ):
+            return name
+        return super().save(name, content, max_length)
+
+
+content_addressed_storage = ContentAddressedStorage()
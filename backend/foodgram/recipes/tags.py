@@ -0,0 +1,32 @@
+import threading
+
+from recipes.models import TableVersion, Tag
+
+
+class TagMap:
+    """
+    Per-process map of tag slugs to ids.
+    Rebuilt when tag table version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = {}
+
+    def _build(self, version):
+        with self._lock:
+            if self._version == version:
+                return
+            self._ids = dict(Tag.objects.values_list('slug', 'id'))
+            self._version = version
+
+    def get_ids(self):
+        """Current mapping of tag slug to tag id."""
+        version, = TableVersion.get_versions((Tag._meta.label, ))
+        if self._version != version:
+            self._build(version)
+        return self._ids
+
+
+tag_map = TagMap()
@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.cart_totals import actual_totals, find_drift, stored_totals
+from recipes.models import Ingredient, IngredientAmount, Tag
+from recipes.tests.utils import create_recipe, create_user
+
+
+class CartTotalsTest(APITestCase):
+    """Stored cart totals against ones aggregated from scratch."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.tag = Tag.objects.create(
+            name='lunch', color='#54E709', slug='lunch'
+        )
+        self.salt, self.flour, self.milk = (
+            Ingredient.objects.create(name=name, measurement_unit='g')
+            for name in ('salt', 'flour', 'milk')
+        )
+        self.recipe = create_recipe(self.author, 'Pie')
+        self.recipe.tags.add(self.tag)
+        self.salt_amount = IngredientAmount.objects.create(
+            recipe=self.recipe, ingredient=self.salt, amount=5
+        )
+        IngredientAmount.objects.create(
+            recipe=self.recipe, ingredient=self.flour, amount=200
+        )
+        other = create_recipe(self.author, 'Bread')
+        IngredientAmount.objects.create(
+            recipe=other, ingredient=self.flour, amount=300
+        )
+        for user in (self.author, self.reader):
+            user.shopping_cart.add(self.recipe, other)
+
+    def assertNoDrift(self):
+        self.assertEqual(find_drift(), {})
+        self.assertTrue(stored_totals())
+
+    def test_amount_added(self):
+        IngredientAmount.objects.create(
+            recipe=self.recipe, ingredient=self.milk, amount=100
+        )
+
+        self.assertNoDrift()
+        self.assertEqual(
+            stored_totals()[(self.reader.pk, self.milk.pk)], 100
+        )
+
+    def test_amount_changed(self):
+        self.salt_amount.amount = 7
+        self.salt_amount.save()
+        self.salt_amount.ingredient = self.milk
+        self.salt_amount.save()
+
+        self.assertNoDrift()
+        self.assertNotIn((self.reader.pk, self.salt.pk), stored_totals())
+
+    def test_amount_removed(self):
+        self.salt_amount.delete()
+
+        self.assertNoDrift()
+        self.assertNotIn((self.reader.pk, self.salt.pk), stored_totals())
+
+    def test_recipe_edited(self):
+        self.client.force_authenticate(self.author)
+
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'tags': [self.tag.pk],
+                'ingredients': [
+                    {'id': self.flour.pk, 'amount': 250},
+                    {'id': self.milk.pk, 'amount': 100},
+                ],
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNoDrift()
+        self.assertEqual(
+            stored_totals()[(self.reader.pk, self.flour.pk)], 550
+        )
+
+    def test_recipe_deleted(self):
+        self.recipe.delete()
+
+        self.assertNoDrift()
+        self.assertEqual(
+            actual_totals(), {
+                (self.author.pk, self.flour.pk): 300,
+                (self.reader.pk, self.flour.pk): 300,
+            }
+        )
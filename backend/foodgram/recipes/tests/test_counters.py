@@ -0,0 +1,33 @@
+from django.test import TestCase
+
+from recipes.counters import COUNTERS, count_drift
+from recipes.tests.utils import create_recipe, create_user
+
+
+class UserDeleteCountersTest(TestCase):
+    """Counters of recipes and authors related to a deleted user."""
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.deleted = create_user('deleted')
+        self.recipe = create_recipe(self.author, 'Soup')
+        self.own_recipe = create_recipe(self.deleted, 'Pie')
+        for user in (self.reader, self.deleted):
+            user.favorited_recipes.add(self.recipe)
+            user.shopping_cart.add(self.recipe)
+            user.subscribes.add(self.author)
+        self.reader.subscribes.add(self.deleted)
+        self.reader.favorited_recipes.add(self.own_recipe)
+
+    def test_counters_are_recounted(self):
+        self.deleted.delete()
+
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.in_cart_count, 1)
+        self.assertEqual(self.author.followers_count, 1)
+        for counter in COUNTERS:
+            with self.subTest(counter=counter):
+                self.assertEqual(count_drift(counter), 0)
@@ -0,0 +1,75 @@
+import shutil
+from datetime import timedelta
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from recipes.images import (claim_recipe, derivative_url, make_derivatives,
+                            process_next_recipe, store_derivatives)
+from recipes.models import Recipe
+from recipes.tests.utils import create_recipe, create_user
+
+
+def image_file(color):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name=f'{color}.png')
+
+
+class RecipeImagesTest(TestCase):
+    """Resized copies of recipe images made by the image worker."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.recipe = create_recipe(
+            create_user('author'), 'Soup', image=image_file('red')
+        )
+
+    def test_derivatives_replace_original_once_made(self):
+        self.assertIsNone(derivative_url(self.recipe, 'card', 'jpeg'))
+
+        process_next_recipe()
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_processed)
+        self.assertIn('_card', derivative_url(self.recipe, 'card', 'jpeg'))
+        self.assertIsNone(claim_recipe())
+
+    def test_image_replaced_while_processing_is_queued_again(self):
+        claimed = claim_recipe()
+        self.recipe.image = image_file('blue')
+        self.recipe.save()
+
+        self.assertFalse(
+            store_derivatives(claimed.pk, make_derivatives(claimed))
+        )
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image_processed)
+        self.assertIsNone(derivative_url(self.recipe, 'card', 'jpeg'))
+        self.assertEqual(claim_recipe().pk, self.recipe.pk)
+
+    def test_crashed_claim_is_retried_after_timeout(self):
+        claim_recipe()
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image_processed)
+        self.assertIsNone(claim_recipe())
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        process_next_recipe()
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_processed)
+        self.assertIsNone(self.recipe.image_claimed_at)
+        self.assertIn('_card', derivative_url(self.recipe, 'card', 'jpeg'))
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe, Tag
+from recipes.timelines import feed_sources
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+# Markers of a sort step, which the indexes are to make unnecessary.
+SORT_MARKERS = {
+    'sqlite': 'TEMP B-TREE FOR ORDER BY',
+    'postgresql': 'Sort Key',
+}
+
+
+@skipUnless(
+    connection.vendor in SORT_MARKERS,
+    'Checks SQLite and PostgreSQL query plans.'
+)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryPlanTest(TestCase):
+    """Hot recipe queries over a seeded dataset use the composite indexes."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.addClassCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_benchmark_data',
+            users=30,
+            recipes=600,
+            ingredients_per_recipe=3,
+            favorites_per_user=10,
+            cart_per_user=2,
+            subscriptions_per_user=5,
+            stdout=StringIO()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user = User.objects.order_by('id').first()
+        cls.tag = Tag.objects.order_by('id').first()
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return ' '.join(row[-1] for row in cursor.fetchall())
+            # Small tables are cheaper to scan, so scans are ruled out
+            # to see, which index the planner takes.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return ' '.join(row[0] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index, ordered=True):
+        plan = self.query_plan(queryset)
+        self.assertIn(index, plan)
+        if ordered:
+            self.assertNotIn(SORT_MARKERS[connection.vendor], plan)
+
+    def test_recipe_list(self):
+        self.assertUsesIndex(
+            Recipe.objects.order_by('-pub_date', '-id')[:10],
+            'recipe_pub_date_id_idx'
+        )
+
+    def test_author_recipes(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(author=self.user).order_by(
+                '-pub_date', '-id'
+            )[:10],
+            'recipe_author_pub_date_idx'
+        )
+
+    def test_tag_filter(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(
+                Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe_id=OuterRef('pk'),
+                        tag_id__in=(self.tag.pk, )
+                    )
+                )
+            ).order_by('-pub_date', '-id')[:10],
+            'recipe_pub_date_id_idx'
+        )
+
+    def test_tagged_recipes(self):
+        self.assertUsesIndex(
+            self.tag.tagged_recipes.values_list('pk', flat=True),
+            'recipe_tags_tag_recipe_idx',
+            ordered=False
+        )
+
+    def test_favorited_recipes(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(favorited=self.user),
+            'recipe_favorited_user_idx',
+            ordered=False
+        )
+
+    def test_timeline(self):
+        timeline, _ = feed_sources(self.user)
+        self.assertUsesIndex(
+            timeline.order_by('-pub_date', '-recipe_id')[:10],
+            'timeline_user_pub_date_idx'
+        )
@@ -0,0 +1,59 @@
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from recipes.search import inverted_index
+from recipes.tests.utils import create_recipe, create_user
+
+
+@skipIf(
+    connection.vendor == 'postgresql',
+    'PostgreSQL searches with its own full-text index.'
+)
+class InvertedIndexTest(APITestCase):
+    """In-process search index follows searchable recipe content."""
+
+    def setUp(self):
+        cache.clear()
+        # Table versions start over in every test.
+        inverted_index.invalidate()
+        self.recipe = create_recipe(create_user('author'), 'Borscht')
+
+    def test_other_recipe_writes_keep_index(self):
+        self.assertEqual(list(inverted_index.search('borscht')), [
+            self.recipe.pk
+        ])
+
+        with mock.patch.object(
+            inverted_index, '_build', wraps=inverted_index._build
+        ) as build:
+            Recipe.objects.filter(pk=self.recipe.pk).bump_version()
+            self.recipe.image_derivatives = {'source': ''}
+            self.recipe.save(update_fields=('image_derivatives', ))
+            self.recipe.cooking_time = 20
+            self.recipe.save()
+            inverted_index.search('borscht')
+
+        build.assert_not_called()
+
+    def test_renamed_recipe_is_found_by_new_name(self):
+        inverted_index.search('borscht')
+
+        self.recipe.name = self.recipe.text = 'Solyanka'
+        self.recipe.save()
+
+        self.assertEqual(inverted_index.search('borscht'), {})
+        self.assertEqual(list(inverted_index.search('solyanka')), [
+            self.recipe.pk
+        ])
+
+    def test_search_with_cursor_pagination_is_rejected(self):
+        response = self.client.get(
+            '/api/recipes/', {'search': 'borscht', 'pagination': 'cursor'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.json())
@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, TableVersion
+from recipes.tests.utils import create_recipe, create_user
+
+
+class IngredientAmountVersionTest(TestCase):
+    """Recipe versions after writes of ingredient amounts."""
+
+    def setUp(self):
+        self.recipe = create_recipe(create_user('author'), 'Soup')
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient {number}', measurement_unit='g')
+            for number in range(10)
+        )
+        self.amounts = IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=self.recipe, ingredient=ingredient,
+                             amount=1)
+            for ingredient in self.ingredients
+        )
+
+    def get_versions(self):
+        return (
+            Recipe.objects.values_list('version', flat=True).get(
+                pk=self.recipe.pk
+            ),
+            TableVersion.get_versions((Recipe._meta.label, ))
+        )
+
+    def test_queryset_delete_is_fast(self):
+        with self.assertNumQueries(1):
+            IngredientAmount.objects.filter(recipe=self.recipe).delete()
+
+    def test_row_write_bumps_versions_once(self):
+        version, table_version = self.get_versions()
+
+        self.amounts[0].amount = 2
+        self.amounts[0].save()
+
+        self.assertEqual(
+            self.get_versions(),
+            (version + 1, (table_version[0] + 1, ))
+        )
+
+    def test_ingredient_delete_bumps_recipe_version(self):
+        version, _ = self.get_versions()
+
+        self.ingredients[0].delete()
+
+        self.assertEqual(self.get_versions()[0], version + 1)
@@ -0,0 +1,22 @@
+from recipes.models import Recipe
+from users.models import User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password',
+        first_name=username,
+        last_name=username
+    )
+
+
+def create_recipe(author, name, **kwargs):
+    return Recipe.objects.create(
+        author=author,
+        name=name,
+        text=name,
+        cooking_time=10,
+        **kwargs
+    )
@@ -0,0 +1,79 @@
+from foodgram.settings import FEED_FANOUT_LIMIT
+from recipes.models import Recipe, TimelineEntry
+from users.models import User
+
+
+def fan_out_recipe(recipe):
+    """
+    Push new recipe to followers timelines,
+    if author has no more than FEED_FANOUT_LIMIT followers.
+    Recipes of bigger authors are merged into feed at read time.
+    """
+    followers_count = User.objects.filter(
+        pk=recipe.author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count is None or followers_count > FEED_FANOUT_LIMIT:
+        return
+    follower_ids = User.subscribes.through.objects.filter(
+        to_user_id=recipe.author_id
+    ).values_list('from_user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=follower_id,
+                recipe=recipe,
+                pub_date=recipe.pub_date
+            )
+            for follower_id in follower_ids
+        ),
+        ignore_conflicts=True
+    )
+    Recipe.objects.filter(pk=recipe.pk).update(fanned_out=True)
+
+
+def add_authors(follower_id, author_ids):
+    """Copy fanned out recipes of followed authors to follower timeline."""
+    recipes = Recipe.objects.filter(
+        author_id__in=author_ids,
+        fanned_out=True
+    ).values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=follower_id,
+                recipe_id=recipe_id,
+                pub_date=pub_date
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True
+    )
+
+
+def remove_authors(follower_id, author_ids=None):
+    """Drop recipes of unfollowed authors from follower timeline."""
+    entries = TimelineEntry.objects.filter(user_id=follower_id)
+    if author_ids is not None:
+        entries = entries.filter(recipe__author_id__in=author_ids)
+    entries.delete()
+
+
+def feed_sources(user):
+    """
+    Timeline entries of user and not fanned out recipes
+    of followed authors, both with pub_date and recipe id columns.
+    Each one is read by its own index, so the feed is their UNION ALL
+    instead of one query over the whole recipe table.
+    The sources never overlap, since only fanned out recipes
+    get into timelines.
+    """
+    timeline = TimelineEntry.objects.filter(user=user).values_list(
+        'pub_date', 'recipe_id'
+    ).order_by()
+    pulled = Recipe.objects.filter(
+        fanned_out=False,
+        author_id__in=User.subscribes.through.objects.filter(
+            from_user=user
+        ).values('to_user_id')
+    ).values_list('pub_date', 'id').order_by()
+    return timeline, pulled
@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+
+from recipes.models import Recipe
+
+_batch = threading.local()
+
+
+def bump_versions(recipe_ids):
+    """
+    Mark cached representations of recipes as outdated.
+    Inside of batch_versions() the update is postponed to its end.
+    """
+    pending = getattr(_batch, 'recipe_ids', None)
+    if pending is None:
+        Recipe.objects.filter(pk__in=recipe_ids).bump_version()
+    else:
+        pending.update(recipe_ids)
+
+
+@contextmanager
+def batch_versions():
+    """
+    Bump version of every recipe written inside of the block once,
+    however many of its rows and relations were changed.
+    Nested blocks are merged into the outer one.
+    """
+    if getattr(_batch, 'recipe_ids', None) is not None:
+        yield
+        return
+    _batch.recipe_ids = set()
+    try:
+        yield
+        recipe_ids = _batch.recipe_ids
+    finally:
+        _batch.recipe_ids = None
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).bump_version()
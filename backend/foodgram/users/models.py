@@ -13,6 +13,16 @@ class User(AbstractUser):
         max_length=254,
         help_text='User email'
     )
+    recipes_count = models.PositiveIntegerField(
+        'Recipes count',
+        default=0,
+        help_text='Number of user recipes'
+    )
+    followers_count = models.PositiveIntegerField(
+        'Followers count',
+        default=0,
+        help_text='Number of subscribers'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
@@ -22,6 +32,9 @@ class User(AbstractUser):
             [subscription.username for subscription in self.subscribes.all()]
         )
 
+    def get_subscribed_ids(self):
+        return set(self.subscribes.values_list('id', flat=True))
+
     def get_shopping_cart(self):
         return [recipe.name for recipe in self.shopping_cart.all()]
 
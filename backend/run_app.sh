@@ -4,4 +4,6 @@ python manage.py makemigrations;
 python manage.py migrate;
 python manage.py loaddata Dump.json;
 python manage.py collectstatic --noinput;
+python manage.py process_shopping_list_jobs &
+python manage.py process_recipe_images &
 gunicorn foodgram.wsgi:application --bind 0.0.0.0:8000;
\ No newline at end of file
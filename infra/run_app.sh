@@ -8,4 +8,6 @@ echo "from django.contrib.auth import get_user_model; User = get_user_model(); U
     python manage.py shell
 echo "Superuser created successfully"
 python manage.py collectstatic --noinput;
+python manage.py process_shopping_list_jobs &
+python manage.py process_recipe_images &
 gunicorn foodgram.wsgi:application --bind 127.0.0.1:8000;
\ No newline at end of file